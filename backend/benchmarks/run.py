@@ -0,0 +1,314 @@
+"""
+Load-test and benchmark suite for the dashboard backend.
+
+Seeds a local persistent ChromaDB with synthetic documents, then drives the FastAPI
+app in-process (httpx ASGITransport, no network) through the dashboard's main
+scenarios at a configurable concurrency and reports latency percentiles,
+throughput and peak RSS. Results can be saved as a baseline and compared later.
+
+Run from the backend/ directory:
+
+    python -m benchmarks.run --docs 10000 --concurrency 8
+    python -m benchmarks.run --docs 10000 --save-baseline
+    python -m benchmarks.run --docs 10000 --compare
+
+The seeded store is kept in --path and reused when it already holds --docs documents.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chromadb  # noqa: E402
+import httpx  # noqa: E402
+from chromadb import EmbeddingFunction  # noqa: E402
+
+import main  # noqa: E402
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+COLLECTION = "bench_docs"
+WRITE_COLLECTION = "bench_writes"
+SOURCES = ["crawl", "upload", "api", "old_crawl", "manual", "sync", "import", "wiki", "mail", "chat"]
+LANGS = ["en", "zh", "de", "fr", "es"]
+WORDS = ("vector database embedding query filter metadata collection document index search "
+         "cluster shard latency throughput cache batch stream page cursor token model").split()
+
+
+class HashEmbeddingFunction(EmbeddingFunction):
+    """Deterministic pseudo-random embeddings so benchmarks need no model download."""
+
+    def __init__(self, dim: int = 64):
+        self.dim = dim
+
+    def __call__(self, input):
+        vectors = []
+        for text in input:
+            seed = int(hashlib.md5(text.encode()).hexdigest()[:8], 16)
+            vectors.append(np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32))
+        return vectors
+
+    @staticmethod
+    def name() -> str:
+        return "benchmark-hash"
+
+    def get_config(self) -> Dict[str, Any]:
+        return {"dim": self.dim}
+
+    @staticmethod
+    def build_from_config(config: Dict[str, Any]) -> "HashEmbeddingFunction":
+        return HashEmbeddingFunction(config.get("dim", 64))
+
+
+class BenchClient:
+    """Client wrapper that opens every collection with the benchmark embedding function."""
+
+    def __init__(self, client, embedding_function: EmbeddingFunction):
+        self._client = client
+        self._embedding_function = embedding_function
+
+    def get_collection(self, name, **kwargs):
+        kwargs.setdefault("embedding_function", self._embedding_function)
+        return self._client.get_collection(name, **kwargs)
+
+    def create_collection(self, name, **kwargs):
+        kwargs.setdefault("embedding_function", self._embedding_function)
+        return self._client.create_collection(name, **kwargs)
+
+    def __getattr__(self, attr):
+        return getattr(self._client, attr)
+
+
+def random_text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def seed(client, docs: int, dim: int, batch_size: int):
+    """Create (or reuse) the benchmark collection holding `docs` synthetic documents."""
+    embedding_function = HashEmbeddingFunction(dim)
+    try:
+        collection = client.get_collection(COLLECTION, embedding_function=embedding_function)
+        if collection.count() == docs:
+            print(f"Reusing seeded collection {COLLECTION} ({docs} documents)")
+            return
+        client.delete_collection(COLLECTION)
+    except Exception:
+        pass
+
+    collection = client.create_collection(COLLECTION, embedding_function=embedding_function)
+    rng = random.Random(42)
+    np_rng = np.random.default_rng(42)
+    start = time.perf_counter()
+    for offset in range(0, docs, batch_size):
+        n = min(batch_size, docs - offset)
+        collection.add(
+            ids=[f"doc-{offset + i:09d}" for i in range(n)],
+            documents=[random_text(rng, rng.randint(5, 60)) for _ in range(n)],
+            metadatas=[{
+                "source": rng.choice(SOURCES),
+                "lang": rng.choice(LANGS),
+                "n": offset + i,
+                "score": round(rng.random(), 4),
+                "reviewed": rng.random() < 0.3,
+            } for i in range(n)],
+            embeddings=np_rng.standard_normal((n, dim)).astype(np.float32),
+        )
+        done = offset + n
+        if done % (batch_size * 10) == 0 or done == docs:
+            print(f"  seeded {done}/{docs} ({done / (time.perf_counter() - start):.0f} docs/s)")
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+async def run_scenario(http: httpx.AsyncClient, name: str, make_request: Callable, requests: int, concurrency: int):
+    """Issue `requests` calls from `concurrency` workers and summarise their latencies."""
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            method, url, body = make_request(i)
+            start = time.perf_counter()
+            response = await http.request(method, url, json=body)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    result = {
+        "requests": requests,
+        "errors": errors,
+        "throughput_rps": round(requests / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 2),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+    print(f"{name:<16} {result['throughput_rps']:>9.1f} req/s  p50 {result['p50_ms']:>8.2f} ms  "
+          f"p95 {result['p95_ms']:>8.2f} ms  p99 {result['p99_ms']:>8.2f} ms  errors {errors}  "
+          f"rss {result['peak_rss_mb']} MB")
+    return result
+
+
+def scenarios(docs: int, page_size: int, add_batch: int) -> Dict[str, Callable]:
+    rng = random.Random(7)
+    last_page = max(docs // page_size, 1)
+    base = f"/api/collections/{COLLECTION}"
+
+    def filter_body(page: int) -> Dict[str, Any]:
+        return {
+            "filters": [
+                {"field": "source", "operator": "equals", "value": "old_crawl"},
+                {"field": "lang", "operator": "equals", "value": "en"},
+            ],
+            "page": page,
+            "limit": page_size,
+        }
+
+    def add_body(i: int) -> Dict[str, Any]:
+        return {
+            "documents": [random_text(rng, 20) for _ in range(add_batch)],
+            "metadatas": [{"source": "bench", "n": i} for _ in range(add_batch)],
+            "ids": [f"bench-add-{i}-{j}-{rng.random()}" for j in range(add_batch)],
+        }
+
+    return {
+        "list": lambda i: ("GET", "/api/collections", None),
+        "first_page": lambda i: ("GET", f"{base}?page=1&limit={page_size}", None),
+        "deep_page": lambda i: ("GET", f"{base}?page={last_page - i % 10}&limit={page_size}", None),
+        "filtered_page": lambda i: ("POST", f"{base}/filter", filter_body(1 + i % 20)),
+        "query": lambda i: ("POST", f"{base}/query", {"query_text": random_text(rng, 8), "n_results": 10}),
+        # Writes go to a scratch collection so the seeded one can be reused across runs
+        "bulk_add": lambda i: ("POST", f"/api/collections/{WRITE_COLLECTION}/add", add_body(i)),
+    }
+
+
+def compare(results: Dict[str, Any], baseline_path: str, tolerance: float) -> bool:
+    """Print the change against a saved baseline; returns False if any scenario regressed."""
+    if not os.path.exists(baseline_path):
+        print(f"No baseline at {baseline_path}")
+        return True
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    ok = True
+    print(f"\nComparison with {baseline_path} (tolerance {tolerance:.0%}):")
+    for name, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if previous is None:
+            continue
+        p95_change = current["p95_ms"] / previous["p95_ms"] - 1 if previous["p95_ms"] else 0.0
+        rps_change = current["throughput_rps"] / previous["throughput_rps"] - 1 if previous["throughput_rps"] else 0.0
+        regressed = p95_change > tolerance or rps_change < -tolerance
+        ok = ok and not regressed
+        print(f"  {name:<16} p95 {p95_change:+.1%}  throughput {rps_change:+.1%}{'  REGRESSION' if regressed else ''}")
+    return ok
+
+
+async def main_async(args) -> Dict[str, Any]:
+    embedding_function = HashEmbeddingFunction(args.dim)
+    client = chromadb.PersistentClient(path=args.path)
+    seed(client, args.docs, args.dim, min(args.seed_batch, client.get_max_batch_size()))
+    try:
+        client.delete_collection(WRITE_COLLECTION)
+    except Exception:
+        pass
+    client.create_collection(WRITE_COLLECTION, embedding_function=embedding_function)
+
+    main.chroma_client = BenchClient(client, embedding_function)
+    transport = httpx.ASGITransport(app=main.app)
+    selected = args.scenarios.split(",") if args.scenarios else None
+    results: Dict[str, Any] = {}
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as http:
+        for name, make_request in scenarios(args.docs, args.page_size, args.add_batch).items():
+            if selected and name not in selected:
+                continue
+            # Warm up caches and connections the way a real dashboard session would
+            for i in range(args.warmup):
+                method, url, body = make_request(i)
+                await http.request(method, url, json=body)
+            results[name] = await run_scenario(http, name, make_request, args.requests, args.concurrency)
+
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "chromadb": getattr(chromadb, "__version__", "unknown"),
+            "cpu_count": os.cpu_count(),
+        },
+        "parameters": {
+            "docs": args.docs,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "page_size": args.page_size,
+            "add_batch": args.add_batch,
+            "dim": args.dim,
+        },
+        "scenarios": results,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the ChromaDB dashboard backend")
+    parser.add_argument("--docs", type=int, default=10_000, help="documents in the seeded collection")
+    parser.add_argument("--dim", type=int, default=64, help="embedding dimension")
+    parser.add_argument("--path", default=os.path.join(BENCH_DIR, ".chroma"), help="persistent ChromaDB directory")
+    parser.add_argument("--seed-batch", type=int, default=5000, help="documents per add() while seeding")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent simulated clients")
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--warmup", type=int, default=5, help="untimed requests per scenario")
+    parser.add_argument("--page-size", type=int, default=50, help="page size for paging scenarios")
+    parser.add_argument("--add-batch", type=int, default=50, help="documents per bulk_add request")
+    parser.add_argument("--scenarios", default="", help="comma-separated subset of scenarios to run")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline results file")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--compare", action="store_true", help="compare against the baseline, exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown when comparing")
+    return parser.parse_args(argv)
+
+
+def main_cli(argv=None) -> int:
+    args = parse_args(argv)
+    results = asyncio.run(main_async(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+    if args.compare and not compare(results, args.baseline, args.tolerance):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
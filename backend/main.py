@@ -1,285 +1,3324 @@
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Optional, Dict, Any, Literal
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import StreamingResponse, PlainTextResponse, JSONResponse, Response
+from pydantic import BaseModel, Field
+from typing import List, Optional, Dict, Any, Literal, Set, Tuple, Union
 import chromadb
 from chromadb.config import Settings
+import numpy as np
 import logging
+import os
+import asyncio
+import functools
+import inspect
+import time
+import json
+import base64
+import hashlib
+import csv
+import io
+import shutil
+import tempfile
+import uuid
+import mmap
+import re
+import contextvars
+import threading
+from urllib.parse import urlparse
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
+from abc import ABC, abstractmethod
+from dotenv import load_dotenv
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: the disk embedding cache cannot lock, so it must not be shared between processes
+    fcntl = None
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Global ChromaDB client
+load_dotenv()
+
+# Data-access settings (override via environment or backend/.env)
+# CHROMA_CLIENT_MODE: "sync" runs chromadb.HttpClient calls on a bounded thread pool,
+# "async" uses chromadb.AsyncHttpClient and awaits its coroutines directly.
+CHROMA_CLIENT_MODE = os.getenv("CHROMA_CLIENT_MODE", "sync").lower()
+CHROMA_MAX_WORKERS = int(os.getenv("CHROMA_MAX_WORKERS", "16"))
+CHROMA_MAX_CONCURRENCY = int(os.getenv("CHROMA_MAX_CONCURRENCY", "32"))
+CHROMA_CALL_TIMEOUT = float(os.getenv("CHROMA_CALL_TIMEOUT", "60"))
+CHROMA_HEALTH_TIMEOUT = float(os.getenv("CHROMA_HEALTH_TIMEOUT", "5"))
+
+# Collection listing: how long a computed listing is served from memory and how many
+# count() calls may run at once while refreshing it
+COLLECTIONS_CACHE_TTL = float(os.getenv("COLLECTIONS_CACHE_TTL", "10"))
+COLLECTION_COUNT_CONCURRENCY = int(os.getenv("COLLECTION_COUNT_CONCURRENCY", "16"))
+
+# Collection handles returned by get_collection(), reused across requests
+COLLECTION_HANDLE_CACHE_SIZE = int(os.getenv("COLLECTION_HANDLE_CACHE_SIZE", "256"))
+COLLECTION_HANDLE_CACHE_TTL = float(os.getenv("COLLECTION_HANDLE_CACHE_TTL", "300"))
+
+# Filtered totals: counts are computed in chunks of FILTER_COUNT_CHUNK_SIZE ids (every chunk
+# rescans the filter from the start, so chunks are large) and cached per (collection, where
+# clause) so later pages of the same filter reuse them. On collections larger than
+# FILTER_COUNT_EXACT_MAX_DOCS exact mode answers like estimate mode until the count is cached
+FILTER_COUNT_CHUNK_SIZE = int(os.getenv("FILTER_COUNT_CHUNK_SIZE", "100000"))
+FILTER_COUNT_EXACT_MAX_DOCS = int(os.getenv("FILTER_COUNT_EXACT_MAX_DOCS", "1000000"))
+FILTER_COUNT_CACHE_SIZE = int(os.getenv("FILTER_COUNT_CACHE_SIZE", "1024"))
+FILTER_COUNT_CACHE_TTL = float(os.getenv("FILTER_COUNT_CACHE_TTL", "300"))
+
+# Cursor paging: the page after the one just served is prefetched and kept this long
+PAGE_PREFETCH_TTL = float(os.getenv("PAGE_PREFETCH_TTL", "30"))
+PAGE_PREFETCH_CACHE_SIZE = int(os.getenv("PAGE_PREFETCH_CACHE_SIZE", "256"))
+
+# Responses at least this many bytes are gzip-compressed for clients that accept it (0 disables)
+RESPONSE_GZIP_MIN_SIZE = int(os.getenv("RESPONSE_GZIP_MIN_SIZE", "1024"))
+
+# Export: documents read from Chroma per batch while streaming a collection out
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+# Background jobs: finished jobs kept for status lookups, errors recorded per job
+JOB_HISTORY_SIZE = int(os.getenv("JOB_HISTORY_SIZE", "100"))
+JOB_MAX_ERRORS = int(os.getenv("JOB_MAX_ERRORS", "100"))
+
+# Bulk import: batch size (0 = the server's max batch size), parallel upload workers
+# and the timeout for one batch, which includes embedding it
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "0"))
+IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", "4"))
+IMPORT_BATCH_TIMEOUT = float(os.getenv("IMPORT_BATCH_TIMEOUT", "300"))
+
+# Delete by filter: documents per delete call (0 = the server's max batch size) and batches
+# deleted in parallel; each round resolves batch size x workers matching ids
+DELETE_BATCH_SIZE = int(os.getenv("DELETE_BATCH_SIZE", "0"))
+DELETE_WORKERS = int(os.getenv("DELETE_WORKERS", "4"))
+
+# Collection migrations: documents per batch, parallel embed/write workers and where
+# checkpoints of interrupted migrations are kept for resuming
+MIGRATION_BATCH_SIZE = int(os.getenv("MIGRATION_BATCH_SIZE", "500"))
+MIGRATION_WORKERS = int(os.getenv("MIGRATION_WORKERS", "4"))
+MIGRATION_CHECKPOINT_DIR = os.getenv(
+    "MIGRATION_CHECKPOINT_DIR", os.path.join(tempfile.gettempdir(), "chroma-dashboard-migrations")
+)
+
+# Similarity queries: queries sent per collection.query call and the per-query result cache
+QUERY_BATCH_SIZE = int(os.getenv("QUERY_BATCH_SIZE", "50"))
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "2048"))
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "300"))
+
+# Query-text embeddings: in-memory LRU bounded by bytes (0 disables the cache) and an
+# optional on-disk store that survives restarts (empty dir disables it)
+EMBEDDING_CACHE_MAX_BYTES = int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "")
+EMBEDDING_CACHE_DISK_MAX_BYTES = int(os.getenv("EMBEDDING_CACHE_DISK_MAX_BYTES", str(1024 * 1024 * 1024)))
+
+# ChromaDB endpoints as comma-separated name=url pairs; the first one is the default.
+# Requests pick an endpoint, tenant and database with the X-Chroma-Endpoint,
+# X-Chroma-Tenant and X-Chroma-Database headers.
+CHROMA_ENDPOINTS = os.getenv("CHROMA_ENDPOINTS", "default=http://localhost:8001")
+CHROMA_DEFAULT_TENANT = os.getenv("CHROMA_DEFAULT_TENANT", "default_tenant")
+CHROMA_DEFAULT_DATABASE = os.getenv("CHROMA_DEFAULT_DATABASE", "default_database")
+# Tenant/database pairs remembered across all endpoints; beyond it the oldest (failed ones first)
+# are forgotten, so arbitrary X-Chroma-Tenant/X-Chroma-Database values cannot grow state forever
+CHROMA_MAX_TARGETS = int(os.getenv("CHROMA_MAX_TARGETS", "64"))
+# Reconnects back off exponentially from CHROMA_RECONNECT_BASE_DELAY to CHROMA_RECONNECT_MAX_DELAY
+# seconds; while backing off, requests to that endpoint fail fast with 503 (circuit open)
+CHROMA_CONNECT_TIMEOUT = float(os.getenv("CHROMA_CONNECT_TIMEOUT", "10"))
+CHROMA_RECONNECT_BASE_DELAY = float(os.getenv("CHROMA_RECONNECT_BASE_DELAY", "1"))
+CHROMA_RECONNECT_MAX_DELAY = float(os.getenv("CHROMA_RECONNECT_MAX_DELAY", "60"))
+
+# Server-sent events: how often the shared health/collections snapshot is recomputed,
+# the minimum gap between recomputes triggered by writes, and the keep-alive period
+EVENTS_INTERVAL = float(os.getenv("EVENTS_INTERVAL", "15"))
+EVENTS_MIN_INTERVAL = float(os.getenv("EVENTS_MIN_INTERVAL", "1"))
+EVENTS_KEEPALIVE = float(os.getenv("EVENTS_KEEPALIVE", "15"))
+
+# Metadata facets: documents read per scan batch, memory bounds (keys per collection,
+# distinct values tracked per key), indexed collections kept and how long before a rescan
+FACET_SCAN_BATCH_SIZE = int(os.getenv("FACET_SCAN_BATCH_SIZE", "1000"))
+FACET_MAX_KEYS = int(os.getenv("FACET_MAX_KEYS", "256"))
+FACET_MAX_VALUES = int(os.getenv("FACET_MAX_VALUES", "1000"))
+FACET_INDEX_CACHE_SIZE = int(os.getenv("FACET_INDEX_CACHE_SIZE", "32"))
+FACET_INDEX_TTL = float(os.getenv("FACET_INDEX_TTL", "3600"))
+
+# Embedding projections: embeddings read per batch, default sample size, memory allowed for
+# holding sampled vectors (above it PCA makes a second pass instead) and the result cache
+PROJECTION_BATCH_SIZE = int(os.getenv("PROJECTION_BATCH_SIZE", "1000"))
+PROJECTION_MAX_POINTS = int(os.getenv("PROJECTION_MAX_POINTS", "200000"))
+PROJECTION_MEMORY_BYTES = int(os.getenv("PROJECTION_MEMORY_BYTES", str(256 * 1024 * 1024)))
+PROJECTION_CACHE_SIZE = int(os.getenv("PROJECTION_CACHE_SIZE", "16"))
+PROJECTION_CACHE_TTL = float(os.getenv("PROJECTION_CACHE_TTL", "3600"))
+
+# Collection statistics: documents read per scan batch and the pause between batches (so a
+# scan never hogs the server), collections kept in memory, how long before a rescan, where
+# results are persisted across restarts (empty disables persistence), and the largest write
+# applied to them in place (bigger writes leave them stale for a rescan instead of re-reading
+# every written document with its embedding)
+STATS_SCAN_BATCH_SIZE = int(os.getenv("STATS_SCAN_BATCH_SIZE", "500"))
+STATS_SCAN_DELAY = float(os.getenv("STATS_SCAN_DELAY", "0.05"))
+STATS_CACHE_SIZE = int(os.getenv("STATS_CACHE_SIZE", "64"))
+STATS_TTL = float(os.getenv("STATS_TTL", "86400"))
+STATS_DIR = os.getenv("STATS_DIR", os.path.join(tempfile.gettempdir(), "chroma-dashboard-stats"))
+STATS_DELTA_MAX_DOCUMENTS = int(os.getenv("STATS_DELTA_MAX_DOCUMENTS", "1000"))
+
+# Near-duplicate detection: embeddings read per batch, default cosine threshold, tile size of the
+# blocked similarity products, vectors held per pass of the exact search, the collection size above
+# which "auto" switches to LSH, LSH tables/bits and candidate margin, groups kept in a job result,
+# and the most similar pairs a search may find before it gives up (low thresholds match almost
+# every pair), plus the lowest threshold accepted
+DEDUP_BATCH_SIZE = int(os.getenv("DEDUP_BATCH_SIZE", "1000"))
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.98"))
+DEDUP_BLOCK_SIZE = int(os.getenv("DEDUP_BLOCK_SIZE", "2048"))
+DEDUP_MEMORY_BYTES = int(os.getenv("DEDUP_MEMORY_BYTES", str(256 * 1024 * 1024)))
+DEDUP_EXACT_MAX_DOCS = int(os.getenv("DEDUP_EXACT_MAX_DOCS", "200000"))
+DEDUP_LSH_TABLES = int(os.getenv("DEDUP_LSH_TABLES", "10"))
+# Bucket keys are stored as uint16, so at most 16 bits per table
+DEDUP_LSH_BITS = min(int(os.getenv("DEDUP_LSH_BITS", "12")), 16)
+DEDUP_LSH_MARGIN = float(os.getenv("DEDUP_LSH_MARGIN", "0.05"))
+DEDUP_MAX_GROUPS = int(os.getenv("DEDUP_MAX_GROUPS", "1000"))
+DEDUP_MAX_PAIRS = int(os.getenv("DEDUP_MAX_PAIRS", "10000000"))
+DEDUP_MIN_THRESHOLD = float(os.getenv("DEDUP_MIN_THRESHOLD", "0.5"))
+
+class Metric:
+    """Minimal Prometheus-style metric holding one value per label combination."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values: Dict[tuple, Any] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> tuple:
+        return tuple(str(labels.get(label, "")) for label in self.labels)
+
+    def _format_labels(self, key: tuple, extra: str = "") -> str:
+        parts = [f'{label}="{value}"' for label, value in zip(self.labels, key)]
+        if extra:
+            parts.append(extra)
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{self._format_labels(key)} {value}" for key, value in self._values.items()]
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: tuple = (), buckets: tuple = ()):
+        super().__init__(name, documentation, labels)
+        self.buckets = buckets
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry["buckets"][i] += 1
+            entry["sum"] += value
+            entry["count"] += 1
+
+    def samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for key, entry in self._values.items():
+                for bound, count in zip(self.buckets, entry["buckets"]):
+                    labels = self._format_labels(key, 'le="%s"' % bound)
+                    lines.append(f"{self.name}_bucket{labels} {count}")
+                labels = self._format_labels(key, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{labels} {entry['count']}")
+                lines.append(f"{self.name}_sum{self._format_labels(key)} {entry['sum']}")
+                lines.append(f"{self.name}_count{self._format_labels(key)} {entry['count']}")
+        return lines
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+SIZE_BUCKETS = (100, 1000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+ROW_BUCKETS = (0, 1, 10, 100, 1000, 10_000, 100_000)
+
+http_requests = Counter("dashboard_http_requests_total", "HTTP requests by route and status", ("method", "route", "status"))
+http_request_duration = Histogram("dashboard_http_request_duration_seconds", "HTTP request latency by route", ("method", "route"), LATENCY_BUCKETS)
+http_request_size = Histogram("dashboard_http_request_size_bytes", "HTTP request body size by route", ("method", "route"), SIZE_BUCKETS)
+http_response_size = Histogram("dashboard_http_response_size_bytes", "HTTP response body size by route", ("method", "route"), SIZE_BUCKETS)
+http_requests_in_flight = Gauge("dashboard_http_requests_in_flight", "HTTP requests currently being served")
+chroma_call_duration = Histogram("dashboard_chroma_call_duration_seconds", "ChromaDB call latency by operation", ("operation",), LATENCY_BUCKETS)
+chroma_call_errors = Counter("dashboard_chroma_call_errors_total", "Failed or timed out ChromaDB calls by operation", ("operation",))
+chroma_call_rows = Histogram("dashboard_chroma_call_rows", "Rows returned (get/query) or sent (add/upsert/update/delete) per ChromaDB call", ("operation",), ROW_BUCKETS)
+chroma_calls_in_flight = Gauge("dashboard_chroma_calls_in_flight", "ChromaDB calls currently running")
+METRICS = [
+    http_requests, http_request_duration, http_request_size, http_response_size, http_requests_in_flight,
+    chroma_call_duration, chroma_call_errors, chroma_call_rows, chroma_calls_in_flight,
+]
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording per-route latency, status, body sizes and in-flight
+    requests. Latency covers the whole response, including streamed bodies.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        state = {"status": 500, "request_bytes": 0, "response_bytes": 0}
+
+        async def receive_wrapper():
+            message = await receive()
+            if message["type"] == "http.request":
+                state["request_bytes"] += len(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                state["response_bytes"] += len(message.get("body", b""))
+            await send(message)
+
+        http_requests_in_flight.inc()
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            http_requests_in_flight.dec()
+            # The router stores the matched route in the scope; label by its template, not the raw path
+            route = getattr(scope.get("route"), "path", "unmatched")
+            method = scope.get("method", "")
+            http_requests.inc(method=method, route=route, status=state["status"])
+            http_request_duration.observe(time.perf_counter() - start, method=method, route=route)
+            http_request_size.observe(state["request_bytes"], method=method, route=route)
+            http_response_size.observe(state["response_bytes"], method=method, route=route)
+
+# Global ChromaDB client for the default endpoint/tenant/database (kept in sync by
+# client_manager; tools such as the benchmarks may also assign it directly)
 chroma_client = None
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    global chroma_client
-    logger.info("Starting up...")
-    
-    try:
-        logger.info("Connecting to ChromaDB at localhost:8001...")
-        logger.info(f"Local chromadb python package version: {getattr(chromadb,'__version__','unknown')}")
+def _parse_endpoints(spec: str) -> "OrderedDict[str, Dict[str, Any]]":
+    endpoints: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+    for i, item in enumerate(part.strip() for part in spec.split(",") if part.strip()):
+        name, _, url = item.rpartition("=")
+        if "://" not in url:
+            url = "http://" + url
+        parsed = urlparse(url)
+        endpoints[name or f"endpoint{i}"] = {
+            "host": parsed.hostname or "localhost",
+            "port": parsed.port or (443 if parsed.scheme == "https" else 8000),
+            "ssl": parsed.scheme == "https",
+        }
+    return endpoints
+
+chroma_endpoints = _parse_endpoints(CHROMA_ENDPOINTS)
+DEFAULT_TARGET = (next(iter(chroma_endpoints), "default"), CHROMA_DEFAULT_TENANT, CHROMA_DEFAULT_DATABASE)
+
+# (endpoint, tenant, database) the current request talks to; copied into tasks it starts
+chroma_target: contextvars.ContextVar = contextvars.ContextVar("chroma_target", default=DEFAULT_TARGET)
+
+def collection_scope(name: str) -> tuple:
+    """Cache key prefix identifying `name` on the current endpoint, tenant and database."""
+    return chroma_target.get() + (name,)
+
+# Thread pool and concurrency limit shared by every ChromaDB call
+chroma_executor: Optional[ThreadPoolExecutor] = None
+chroma_semaphore: Optional[asyncio.Semaphore] = None
+
+def _ensure_chroma_runtime():
+    """Create the executor and semaphore on first use (normally done in lifespan)."""
+    global chroma_executor, chroma_semaphore
+    if chroma_executor is None:
+        chroma_executor = ThreadPoolExecutor(max_workers=CHROMA_MAX_WORKERS, thread_name_prefix="chroma")
+    if chroma_semaphore is None:
+        chroma_semaphore = asyncio.Semaphore(CHROMA_MAX_CONCURRENCY)
+
+async def chroma_call(fn, *args, timeout: Optional[float] = None, **kwargs):
+    """
+    Run a ChromaDB client or collection method without blocking the event loop.
+
+    In "sync" mode the call is dispatched to the bounded thread pool; in "async"
+    mode the AsyncHttpClient coroutine is awaited directly. Either way it counts
+    against CHROMA_MAX_CONCURRENCY and is abandoned after `timeout` seconds
+    (CHROMA_CALL_TIMEOUT by default, 0 disables the limit).
+    """
+    _ensure_chroma_runtime()
+    if timeout is None:
+        timeout = CHROMA_CALL_TIMEOUT
+    name = getattr(fn, "__name__", repr(fn))
+
+    async with chroma_semaphore:
+        chroma_calls_in_flight.inc()
+        start = time.perf_counter()
+        try:
+            if CHROMA_CLIENT_MODE == "async" or inspect.iscoroutinefunction(fn):
+                awaitable = fn(*args, **kwargs)
+            else:
+                loop = asyncio.get_running_loop()
+                awaitable = loop.run_in_executor(chroma_executor, functools.partial(fn, *args, **kwargs))
+            if inspect.isawaitable(awaitable):
+                result = await asyncio.wait_for(awaitable, timeout=timeout if timeout > 0 else None)
+            else:
+                result = awaitable
+        except asyncio.TimeoutError:
+            chroma_call_errors.inc(operation=name)
+            logger.error(f"ChromaDB call {name} timed out after {timeout}s")
+            raise HTTPException(status_code=504, detail=f"ChromaDB call '{name}' timed out after {timeout}s")
+        except Exception as e:
+            chroma_call_errors.inc(operation=name)
+            if is_connection_error(e):
+                client_manager.report_failure(chroma_target.get(), e)
+            raise
+        finally:
+            chroma_calls_in_flight.dec()
+            chroma_call_duration.observe(time.perf_counter() - start, operation=name)
+
+    rows = _chroma_rows(name, result, kwargs)
+    if rows is not None:
+        chroma_call_rows.observe(rows, operation=name)
+    return result
+
+def _chroma_rows(operation: str, result, kwargs: Dict[str, Any]) -> Optional[int]:
+    """Rows returned by a read or sent by a write, for the rows-per-call histogram."""
+    try:
+        if operation == "get":
+            return len(result["ids"])
+        if operation == "query":
+            return sum(len(ids) for ids in result["ids"])
+        if operation in ("add", "upsert", "update", "delete") and kwargs.get("ids") is not None:
+            return len(kwargs["ids"])
+    except Exception:
+        pass
+    return None
+
+class TTLCache:
+    """
+    Small thread-safe LRU cache whose entries expire `ttl` seconds after being set.
+    `maxsize` bounds the number of entries; a `ttl` of 0 disables caching.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Any, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0 or self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def invalidate(self, predicate):
+        """Drop every entry whose key satisfies `predicate`."""
+        with self._lock:
+            for key in [k for k in self._data if predicate(k)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+class EmbeddingCache(ABC):
+    """Interface for query-embedding stores keyed by a hash of (model, text)."""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[np.ndarray]:
+        ...
+
+    @abstractmethod
+    def put(self, key: str, vector: np.ndarray):
+        ...
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        ...
+
+class MemoryEmbeddingCache(EmbeddingCache):
+    """LRU of float32 vectors bounded by the total bytes held."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            vector = self._data.get(key)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def put(self, key: str, vector: np.ndarray):
+        size = vector.nbytes + len(key)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._data.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous.nbytes + len(key)
+            self._data[key] = vector
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                old_key, old_vector = self._data.popitem(last=False)
+                self.bytes -= old_vector.nbytes + len(old_key)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+class DiskEmbeddingCache(EmbeddingCache):
+    """
+    Append-only on-disk store: vectors go to `vectors.f32`, read back through a
+    memory map, and `index.ndjson` records each key's offset and dimension.
+    Writes stop once the data file reaches `max_bytes`. Several processes (e.g.
+    uvicorn workers) may share a directory: writers append under an exclusive
+    flock at the file's real end, and readers pick up index lines others appended.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        os.makedirs(directory, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._data_path = os.path.join(directory, "vectors.f32")
+        self._index_path = os.path.join(directory, "index.ndjson")
+        self._index: Dict[str, tuple] = {}
+        self._map: Optional[mmap.mmap] = None
+        self._lock = threading.Lock()
+        # Bytes of index.ndjson already loaded
+        self._index_position = 0
+        open(self._data_path, "ab").close()
+        open(self._index_path, "ab").close()
+        self._size = os.path.getsize(self._data_path)
+        self._read_index()
+
+    def _read_index(self):
+        """Load complete index lines appended since the last read, by any process."""
+        with open(self._index_path, "rb") as f:
+            f.seek(self._index_position)
+            chunk = f.read()
+        end = chunk.rfind(b"\n") + 1
+        self._index_position += end
+        self._size = max(self._size, os.path.getsize(self._data_path))
+        for line in chunk[:end].splitlines():
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            # Ignore entries whose vector never made it to disk
+            if entry["o"] + entry["d"] * 4 <= self._size:
+                self._index[entry["k"]] = (entry["o"], entry["d"])
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                self._read_index()
+                entry = self._index.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            offset, dim = entry
+            if self._map is None or len(self._map) < offset + dim * 4:
+                if self._map is not None:
+                    self._map.close()
+                with open(self._data_path, "rb") as f:
+                    self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self.hits += 1
+            return np.frombuffer(self._map, dtype=np.float32, count=dim, offset=offset).copy()
+
+    def put(self, key: str, vector: np.ndarray):
+        data = np.ascontiguousarray(vector, dtype=np.float32).tobytes()
+        with self._lock, open(self._data_path, "ab") as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                self._read_index()
+                # Another process may have appended since we last looked: write at the real end
+                f.seek(0, os.SEEK_END)
+                offset = f.tell()
+                if key in self._index or offset + len(data) > self.max_bytes:
+                    return
+                f.write(data)
+                f.flush()
+                with open(self._index_path, "a") as index:
+                    index.write(json.dumps({"k": key, "o": offset, "d": len(vector)}) + "\n")
+                self._index[key] = (offset, len(vector))
+                self._size = offset + len(data)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._index),
+            "bytes": self._size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+class TieredEmbeddingCache(EmbeddingCache):
+    """Memory cache in front of an optional disk store; disk hits are promoted to memory."""
+
+    def __init__(self, memory: MemoryEmbeddingCache, disk: Optional[DiskEmbeddingCache] = None):
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        vector = self.memory.get(key)
+        if vector is None and self.disk is not None:
+            vector = self.disk.get(key)
+            if vector is not None:
+                self.memory.put(key, vector)
+        return vector
+
+    def put(self, key: str, vector: np.ndarray):
+        self.memory.put(key, vector)
+        if self.disk is not None:
+            self.disk.put(key, vector)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "memory": self.memory.stats(),
+            "disk": self.disk.stats() if self.disk is not None else None,
+        }
+
+def _build_embedding_cache() -> Optional[EmbeddingCache]:
+    if EMBEDDING_CACHE_MAX_BYTES <= 0:
+        return None
+    disk = None
+    if EMBEDDING_CACHE_DIR:
+        try:
+            disk = DiskEmbeddingCache(EMBEDDING_CACHE_DIR, EMBEDDING_CACHE_DISK_MAX_BYTES)
+        except Exception as e:
+            logger.warning(f"Disk embedding cache at {EMBEDDING_CACHE_DIR} unavailable: {e}")
+    return TieredEmbeddingCache(MemoryEmbeddingCache(EMBEDDING_CACHE_MAX_BYTES), disk)
+
+embedding_cache: Optional[EmbeddingCache] = _build_embedding_cache()
+
+# Cached result of GET /api/collections per target, refreshed by at most one request at a time
+# per target so a slow endpoint never holds up listings of the others
+collections_cache = TTLCache(maxsize=64, ttl=COLLECTIONS_CACHE_TTL)
+collections_refresh_locks: Dict[tuple, asyncio.Lock] = {}
+
+# Collection handles keyed by (endpoint, tenant, database, name)
+collection_handle_cache = TTLCache(maxsize=COLLECTION_HANDLE_CACHE_SIZE, ttl=COLLECTION_HANDLE_CACHE_TTL)
+
+# Filtered totals keyed by (collection scope, version, where key), plus the counts currently running
+filter_count_cache = TTLCache(maxsize=FILTER_COUNT_CACHE_SIZE, ttl=FILTER_COUNT_CACHE_TTL)
+filter_count_tasks: Dict[tuple, asyncio.Task] = {}
+
+# Pages fetched (or prefetched) for cursor paging, keyed by (collection scope, version, where key, offset, limit)
+page_cache = TTLCache(maxsize=PAGE_PREFETCH_CACHE_SIZE, ttl=PAGE_PREFETCH_TTL)
+page_fetch_tasks: Dict[tuple, asyncio.Task] = {}
+
+# Query results keyed by (collection scope, version, query key, where key, where_document key, n_results)
+query_result_cache = TTLCache(maxsize=QUERY_CACHE_SIZE, ttl=QUERY_CACHE_TTL)
+
+# Metadata facet indexes keyed by collection scope, plus the scans building them
+facet_indexes = TTLCache(maxsize=FACET_INDEX_CACHE_SIZE, ttl=FACET_INDEX_TTL)
+facet_build_tasks: Dict[tuple, asyncio.Task] = {}
+
+# Collection statistics keyed by collection scope, plus the scans computing them
+collection_stats = TTLCache(maxsize=STATS_CACHE_SIZE, ttl=STATS_TTL)
+stats_scan_tasks: Dict[tuple, asyncio.Task] = {}
+
+# 2D embedding projections keyed by (collection scope, version, filter key, method, sample, seed),
+# plus the computations currently running
+projection_cache = TTLCache(maxsize=PROJECTION_CACHE_SIZE, ttl=PROJECTION_CACHE_TTL)
+projection_tasks: Dict[tuple, asyncio.Task] = {}
+
+# Bumped whenever the dashboard writes to a collection so derived results keyed by
+# version can never be served (or stored) for stale data
+collection_versions: Dict[tuple, int] = {}
+
+# Server-sent event subscribers (one queue per open stream), the last pushed snapshot
+# and the shared task that computes it
+event_subscribers: Set[asyncio.Queue] = set()
+event_snapshot: Dict[str, Any] = {}
+event_broadcaster: Optional[asyncio.Task] = None
+event_wakeup: Optional[asyncio.Event] = None
+
+def invalidate_collection_caches(collection_name: str):
+    """
+    Forget cached state after the dashboard writes to a collection. Versions only ever go up:
+    entries keyed by an old version (facet index, stats) must never become valid again.
+    """
+    collections_cache.clear()
+    if event_wakeup is not None:
+        event_wakeup.set()
+    scope = collection_scope(collection_name)
+    collection_versions[scope] = collection_versions.get(scope, 0) + 1
+    filter_count_cache.invalidate(lambda key: key[0] == scope)
+    page_cache.invalidate(lambda key: key[0] == scope)
+    query_result_cache.invalidate(lambda key: key[0] == scope)
+
+def collection_version(collection_name: str) -> int:
+    return collection_versions.get(collection_scope(collection_name), 0)
+
+def _handle_key(name: str) -> tuple:
+    return collection_scope(name)
+
+def forget_collection_handle(name: str):
+    """Evict a cached handle, e.g. after the collection was deleted or recreated."""
+    scope = collection_scope(name)
+    collection_handle_cache.pop(scope)
+
+def where_key(where: Optional[Dict[str, Any]], where_document: Optional[Dict[str, Any]] = None) -> str:
+    """Stable string form of a where clause (and where_document, if any), used in cache keys."""
+    value = [where or {}, where_document] if where_document else where or {}
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+
+def filter_params(where: Optional[Dict[str, Any]], where_document: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """The where/where_document keyword arguments for collection.get(), omitting empty ones."""
+    params = {}
+    if where:
+        params["where"] = where
+    if where_document:
+        params["where_document"] = where_document
+    return params
+
+async def count_matching(collection, where: Dict[str, Any], where_document: Optional[Dict[str, Any]] = None) -> int:
+    """Count documents matching `where` chunk by chunk, never holding the full id list."""
+    total = 0
+    offset = 0
+    while True:
+        chunk = await chroma_call(
+            collection.get,
+            **filter_params(where, where_document),
+            limit=FILTER_COUNT_CHUNK_SIZE,
+            offset=offset,
+            include=[]
+        )
+        n = len(chunk["ids"])
+        total += n
+        if n < FILTER_COUNT_CHUNK_SIZE:
+            return total
+        offset += n
+
+def filtered_count_task(collection_name: str, collection, where: Dict[str, Any],
+                        where_document: Optional[Dict[str, Any]] = None) -> asyncio.Task:
+    """
+    Return the task counting `where` matches in a collection, starting one if none is running.
+    Concurrent requests for the same filter share a single count; the result is cached.
+    """
+    key = (collection_scope(collection_name), collection_version(collection_name), where_key(where, where_document))
+    task = filter_count_tasks.get(key)
+    if task is not None:
+        return task
+
+    async def run():
+        try:
+            count = await count_matching(collection, where, where_document)
+            filter_count_cache.set(key, count)
+            return count
+        except Exception as e:
+            logger.warning(f"Counting filtered documents in {collection_name} failed: {e}")
+            raise
+        finally:
+            filter_count_tasks.pop(key, None)
+
+    task = asyncio.create_task(run())
+    # Mark failures as retrieved so estimate-mode counts nobody awaits don't warn at exit
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+    filter_count_tasks[key] = task
+    return task
+
+def cached_filtered_count(collection_name: str, where: Dict[str, Any],
+                          where_document: Optional[Dict[str, Any]] = None) -> Optional[int]:
+    return filter_count_cache.get((collection_scope(collection_name), collection_version(collection_name),
+                                   where_key(where, where_document)))
+
+async def get_collection_handle(name: str):
+    """Return the collection handle for `name`, calling get_collection() only on a cache miss."""
+    key = _handle_key(name)
+    collection = collection_handle_cache.get(key)
+    if collection is None:
+        client = await get_chroma_client()
+        collection = await chroma_call(client.get_collection, name=name)
+        collection_handle_cache.set(key, collection)
+    return collection
+
+def is_missing_collection_error(e: Exception, collection_name: str) -> bool:
+    """True when `e` says the collection is gone; its cached handle is dropped as a side effect."""
+    if "does not exist" in str(e):
+        forget_collection_handle(collection_name)
+        return True
+    return False
+
+def is_connection_error(e: Exception) -> bool:
+    """True when `e` means the ChromaDB server could not be reached (as opposed to a bad request)."""
+    if isinstance(e, ConnectionError):
+        return True
+    return type(e).__name__ in ("ConnectError", "ConnectTimeout", "RemoteProtocolError") or "Could not connect" in str(e)
+
+def _is_modern_client() -> bool:
+    try:
+        parts = getattr(chromadb, "__version__", "0").split(".")
+        major = int(parts[0]); minor = int(parts[1]) if len(parts) > 1 else 0
+        return (major, minor) >= (0, 5)
+    except Exception:
+        return False
+
+class ChromaClientManager:
+    """
+    One client per (endpoint, tenant, database), created on first use.
+
+    A failed connect or a connection error reported by chroma_call drops the client
+    and opens the circuit for that target: requests fail fast with 503 until the
+    backoff delay (doubling from CHROMA_RECONNECT_BASE_DELAY up to
+    CHROMA_RECONNECT_MAX_DELAY) has passed, then one request tries to reconnect.
+    The strategy that worked and the server version are remembered per endpoint,
+    so reconnects skip the probing done on the first connect. At most CHROMA_MAX_TARGETS
+    targets are tracked; the oldest ones not connecting right now make room for new ones.
+    """
+
+    def __init__(self, endpoints: Dict[str, Dict[str, Any]]):
+        self.endpoints = endpoints
+        self.clients: Dict[tuple, Any] = {}
+        self.failures: Dict[tuple, int] = {}
+        self.retry_at: Dict[tuple, float] = {}
+        self.last_error: Dict[tuple, str] = {}
+        self.strategies: Dict[str, str] = {}
+        self.server_versions: Dict[str, str] = {}
+        self._locks: Dict[tuple, asyncio.Lock] = {}
+
+    def cached(self, target: tuple):
+        return self.clients.get(target)
+
+    def _admit(self, target: tuple):
+        """Forget the oldest targets (never-connected ones first) to make room for `target`."""
+        while target not in self._locks and len(self._locks) >= CHROMA_MAX_TARGETS:
+            idle = [t for t, lock in self._locks.items() if t != DEFAULT_TARGET and not lock.locked()]
+            if not idle:
+                return
+            self.forget(next((t for t in idle if t not in self.clients), idle[0]))
+
+    def forget(self, target: tuple):
+        """Drop everything remembered about `target`, including its cached collection handles."""
+        self.clients.pop(target, None)
+        self.failures.pop(target, None)
+        self.retry_at.pop(target, None)
+        self.last_error.pop(target, None)
+        self._locks.pop(target, None)
+        collections_refresh_locks.pop(target, None)
+        collection_handle_cache.invalidate(lambda key: key[:3] == target)
+
+    def _strategies(self, endpoint: Dict[str, Any], tenant: str, database: str) -> List[tuple]:
+        host, port, ssl = endpoint["host"], endpoint["port"], endpoint["ssl"]
+        base = dict(host=host, port=port, ssl=ssl)
+        scoped = dict(base, tenant=tenant, database=database)
+        if _is_modern_client():
+            return [
+                ("v2_settings", lambda: chromadb.HttpClient(**scoped, settings=Settings(
+                    api_version="v2", chroma_server_host=host, chroma_server_http_port=port, anonymized_telemetry=False))),
+                ("tenant_database", lambda: chromadb.HttpClient(**scoped)),
+            ] + ([("plain", lambda: chromadb.HttpClient(**base))]
+                 if (tenant, database) == ("default_tenant", "default_database") else [])
+        # Legacy (<0.5) clients only know the default tenant and database
+        return [
+            ("plain", lambda: chromadb.HttpClient(**base)),
+            ("legacy_v2_settings", lambda: chromadb.HttpClient(**base, settings=Settings(
+                chroma_server_host=host, chroma_server_http_port=port, allow_reset=True,
+                anonymized_telemetry=False, api_version="v2"))),
+        ]
+
+    def _connect_sync(self, target: tuple):
+        endpoint_name, tenant, database = target
+        strategies = self._strategies(self.endpoints[endpoint_name], tenant, database)
+        known = self.strategies.get(endpoint_name)
+        strategies.sort(key=lambda strategy: strategy[0] != known)
+        errors: List[str] = []
+        for name, factory in strategies:
+            try:
+                client = factory()
+                client.heartbeat()
+            except Exception as e:
+                errors.append(f"{name}:{e}")
+                logger.warning(f"ChromaDB endpoint {endpoint_name}: strategy {name} failed: {e}")
+                continue
+            self.strategies[endpoint_name] = name
+            if endpoint_name not in self.server_versions:
+                try:
+                    self.server_versions[endpoint_name] = str(client.get_version())
+                except Exception as ve:
+                    logger.warning(f"get_version failed on {endpoint_name}: {ve}")
+            return client
+        raise RuntimeError("All connection strategies failed: " + " | ".join(errors))
+
+    async def _connect(self, target: tuple):
+        endpoint_name, tenant, database = target
+        if CHROMA_CLIENT_MODE == "async":
+            endpoint = self.endpoints[endpoint_name]
+            client = await chromadb.AsyncHttpClient(host=endpoint["host"], port=endpoint["port"], ssl=endpoint["ssl"],
+                                                    tenant=tenant, database=database)
+            await client.heartbeat()
+            if endpoint_name not in self.server_versions:
+                self.server_versions[endpoint_name] = str(await client.get_version())
+            self.strategies[endpoint_name] = "async"
+            return client
+        _ensure_chroma_runtime()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(chroma_executor, self._connect_sync, target)
+
+    async def get(self, target: tuple):
+        """Return the client for `target`, connecting if needed; raises 503 while the circuit is open."""
+        global chroma_client
+        client = self.clients.get(target)
+        if client is not None:
+            return client
+        if target[0] not in self.endpoints:
+            raise HTTPException(status_code=400, detail=f"Unknown ChromaDB endpoint '{target[0]}'")
+        self._admit(target)
+        lock = self._locks.setdefault(target, asyncio.Lock())
+        async with lock:
+            client = self.clients.get(target)
+            if client is not None:
+                return client
+            wait = self.retry_at.get(target, 0) - time.monotonic()
+            if wait > 0:
+                raise HTTPException(status_code=503, detail=f"ChromaDB endpoint '{target[0]}' unavailable "
+                                    f"(retrying in {wait:.1f}s): {self.last_error.get(target, '')}")
+            endpoint = self.endpoints[target[0]]
+            logger.info(f"Connecting to ChromaDB endpoint {target[0]} at {endpoint['host']}:{endpoint['port']} "
+                        f"(tenant={target[1]}, database={target[2]})...")
+            try:
+                client = await asyncio.wait_for(self._connect(target), timeout=CHROMA_CONNECT_TIMEOUT)
+            except Exception as e:
+                detail = str(e) or type(e).__name__
+                self.report_failure(target, detail)
+                logger.error(f"Failed to connect to ChromaDB endpoint {target[0]}: {detail}")
+                raise HTTPException(status_code=503, detail=f"Failed to connect to ChromaDB endpoint '{target[0]}': {detail}")
+            self.clients[target] = client
+            self.failures.pop(target, None)
+            self.retry_at.pop(target, None)
+            self.last_error.pop(target, None)
+            logger.info(f"Connected to ChromaDB endpoint {target[0]} with strategy {self.strategies.get(target[0])}, "
+                        f"server version {self.server_versions.get(target[0], 'unknown')}")
+            if target == DEFAULT_TARGET:
+                chroma_client = client
+            return client
+
+    def report_failure(self, target: tuple, error):
+        """Drop the client for `target` and back off before the next reconnect."""
+        global chroma_client
+        if self.clients.pop(target, None) is not None and target == DEFAULT_TARGET:
+            chroma_client = None
+        failures = self.failures.get(target, 0) + 1
+        self.failures[target] = failures
+        self.retry_at[target] = time.monotonic() + min(
+            CHROMA_RECONNECT_BASE_DELAY * 2 ** (failures - 1), CHROMA_RECONNECT_MAX_DELAY)
+        self.last_error[target] = str(error)
+        forget = lambda key: key[:3] == target
+        collection_handle_cache.invalidate(forget)
+
+    def status(self) -> List[Dict[str, Any]]:
+        now = time.monotonic()
+        result = []
+        for name, endpoint in self.endpoints.items():
+            targets = sorted({t for t in list(self.clients) + list(self.failures) if t[0] == name})
+            result.append({
+                "name": name,
+                "host": endpoint["host"],
+                "port": endpoint["port"],
+                "ssl": endpoint["ssl"],
+                "default": name == DEFAULT_TARGET[0],
+                "server_version": self.server_versions.get(name),
+                "strategy": self.strategies.get(name),
+                "targets": [{
+                    "tenant": t[1],
+                    "database": t[2],
+                    "connected": t in self.clients,
+                    "failures": self.failures.get(t, 0),
+                    "retry_in": max(0.0, round(self.retry_at.get(t, 0) - now, 1)),
+                    "last_error": self.last_error.get(t),
+                } for t in targets],
+            })
+        return result
+
+client_manager = ChromaClientManager(chroma_endpoints)
+
+def current_client():
+    """Client for the current target once connected (handlers call get_chroma_client() first)."""
+    target = chroma_target.get()
+    if target == DEFAULT_TARGET and chroma_client is not None:
+        return chroma_client
+    return client_manager.cached(target)
+
+async def get_chroma_client():
+    """Client for the current request's endpoint/tenant/database, connecting lazily."""
+    client = current_client()
+    if client is not None:
+        return client
+    return await client_manager.get(chroma_target.get())
+
+class ChromaTargetMiddleware:
+    """Pick the endpoint, tenant and database for a request from its X-Chroma-* headers."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers") or [])
+        endpoint = headers.get(b"x-chroma-endpoint", b"").decode("latin-1").strip() or DEFAULT_TARGET[0]
+        tenant = headers.get(b"x-chroma-tenant", b"").decode("latin-1").strip() or DEFAULT_TARGET[1]
+        database = headers.get(b"x-chroma-database", b"").decode("latin-1").strip() or DEFAULT_TARGET[2]
+        if endpoint not in chroma_endpoints:
+            # Only configured endpoints can be reached, never arbitrary hosts
+            response = PlainTextResponse(f"Unknown ChromaDB endpoint '{endpoint}'", status_code=400)
+            await response(scope, receive, send)
+            return
+        token = chroma_target.set((endpoint, tenant, database))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            chroma_target.reset(token)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global chroma_executor
+    logger.info("Starting up...")
+    _ensure_chroma_runtime()
+    logger.info(f"ChromaDB data access: mode={CHROMA_CLIENT_MODE}, workers={CHROMA_MAX_WORKERS}, "
+                f"max_concurrency={CHROMA_MAX_CONCURRENCY}, timeout={CHROMA_CALL_TIMEOUT}s")
+    logger.info(f"Local chromadb python package version: {getattr(chromadb,'__version__','unknown')}")
+    logger.info(f"ChromaDB endpoints: " + ", ".join(
+        f"{name}={e['host']}:{e['port']}" for name, e in chroma_endpoints.items()))
+
+    # Connect to the default endpoint in the background so startup never waits on ChromaDB;
+    # requests arriving before it is ready connect (or fail fast) on their own
+    async def warm_up():
+        try:
+            await get_chroma_client()
+        except HTTPException as e:
+            logger.error(f"{e.detail}")
+            logger.error("Please ensure ChromaDB is running and matches the client version; "
+                         "the connection is retried on the next request.")
+
+    warm_up_task = asyncio.create_task(warm_up())
+    yield
+    # Cleanup
+    warm_up_task.cancel()
+    if chroma_executor is not None:
+        chroma_executor.shutdown(wait=False)
+        chroma_executor = None
+
+app = FastAPI(
+    title="ChromaDB Management API",
+    description="API for managing ChromaDB collections and documents",
+    version="1.0.0",
+    lifespan=lifespan
+)
+
+app.add_middleware(ChromaTargetMiddleware)
+if RESPONSE_GZIP_MIN_SIZE > 0:
+    app.add_middleware(GZipMiddleware, minimum_size=RESPONSE_GZIP_MIN_SIZE)
+app.add_middleware(MetricsMiddleware)
+
+# CORS middleware
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["http://localhost:3000"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+# Pydantic models
+class CollectionCreate(BaseModel):
+    name: str
+
+class CollectionQuery(BaseModel):
+    query_text: str
+    n_results: int = 5
+
+class BatchQuery(BaseModel):
+    # Exactly one of query_texts / query_embeddings
+    query_texts: Optional[List[str]] = None
+    query_embeddings: Optional[List[List[float]]] = None
+    n_results: int = Field(5, ge=1, le=1000)
+    where: Optional[Dict[str, Any]] = None
+    where_document: Optional[Dict[str, Any]] = None
+
+class DocumentAdd(BaseModel):
+    documents: List[str]
+    metadatas: Optional[List[Dict[str, Any]]] = None
+    ids: Optional[List[str]] = None
+
+class DocumentDelete(BaseModel):
+    ids: List[str]
+
+class HealthResponse(BaseModel):
+    status: str
+    message: Optional[str] = None
+
+class CollectionInfo(BaseModel):
+    name: str
+    count: int
+
+class CollectionData(BaseModel):
+    # Row dicts, or {"ids": [...], "documents": [...], "metadatas": [...]} with format=columns
+    data: Union[List[Dict[str, Any]], Dict[str, List[Any]]]
+    total: int
+    page: int
+    limit: int
+    total_exact: bool = True
+    has_more: Optional[bool] = None
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
+class QueryResult(BaseModel):
+    id: str
+    document: Optional[str] = None
+    metadata: Optional[Dict[str, Any]] = None
+    distance: Optional[float] = None
+
+class JobStatus(BaseModel):
+    id: str
+    kind: str
+    collection: str
+    status: Literal["pending", "running", "completed", "failed", "cancelled"] = "pending"
+    processed: int = 0
+    failed: int = 0
+    total: Optional[int] = None
+    progress: Optional[float] = None
+    rate: Optional[float] = None
+    eta_seconds: Optional[float] = None
+    errors: List[Dict[str, Any]] = []
+    result: Optional[Dict[str, Any]] = None
+    message: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+class BatchQueryResponse(BaseModel):
+    results: List[List[QueryResult]]
+    cache_hits: int
+
+class FacetValue(BaseModel):
+    value: Any
+    type: str
+    count: int
+
+class FacetField(BaseModel):
+    key: str
+    count: int
+    types: Dict[str, int]
+    distinct: int
+    # False once more than FACET_MAX_VALUES distinct values were seen; `distinct` is then a lower bound
+    distinct_exact: bool
+    top: List[FacetValue]
+
+class FacetsResponse(BaseModel):
+    collection: str
+    status: Literal["building", "ready", "failed"]
+    # True while the collection changed in ways the index could not follow; a rescan is running
+    stale: bool
+    documents: int
+    keys_exact: bool
+    fields: List[FacetField]
+    message: Optional[str] = None
+
+class HistogramBucket(BaseModel):
+    min: float
+    # None for the open-ended last bucket
+    max: Optional[float] = None
+    count: int
+
+class TextStats(BaseModel):
+    documents: int
+    bytes: int
+    mean_length: Optional[float] = None
+    length_histogram: List[HistogramBucket]
+
+class MetadataStats(BaseModel):
+    documents: int
+    # Documents having each key, and that as a fraction of all documents
+    keys: Dict[str, int]
+    coverage: Dict[str, float]
+    keys_exact: bool
+
+class EmbeddingStats(BaseModel):
+    count: int
+    dimensions: Dict[int, int]
+    mean_norm: Optional[float] = None
+    std_norm: Optional[float] = None
+    norm_histogram: List[HistogramBucket]
+
+class CollectionStatsResponse(BaseModel):
+    collection: str
+    status: Literal["scanning", "ready", "failed"]
+    # True while the collection changed in ways the stats could not follow; a rescan is running
+    stale: bool
+    documents: int
+    scanned_at: Optional[float] = None
+    text: TextStats
+    metadata: MetadataStats
+    embeddings: EmbeddingStats
+    message: Optional[str] = None
+
+class FilterCondition(BaseModel):
+    field: str
+    operator: Literal[
+        "equals", "not_equals", "contains", "exists", "not_exists", "not_empty",
+        "gt", "gte", "lt", "lte", "in", "not_in"
+    ]
+    # Strings, numbers and booleans are matched as sent; "in"/"not_in" take a list or a comma-separated string
+    value: Optional[Union[bool, int, float, str, List[Union[bool, int, float, str]]]] = None
+    # Coerce string values (e.g. typed into the UI) before matching; range operators always expect numbers
+    value_type: Optional[Literal["string", "number", "bool"]] = None
+
+class ProjectionRequest(BaseModel):
+    method: Literal["pca", "random"] = "pca"
+    filters: List[FilterCondition] = []
+    where: Optional[Dict[str, Any]] = None
+    where_document: Optional[Dict[str, Any]] = None
+    # Approximate number of points to project (a deterministic sample by id); 0 projects everything
+    sample: int = Field(PROJECTION_MAX_POINTS, ge=0)
+    # Seeds both the sample and the random projection
+    seed: int = 0
+    # "binary": a JSON header (ids, stats) followed by float32 x/y pairs; "json": everything as JSON
+    format: Literal["binary", "json"] = "binary"
+
+class DeleteByFilter(BaseModel):
+    filters: List[FilterCondition] = []
+    match: Literal["all", "any"] = "all"
+    where: Optional[Dict[str, Any]] = None
+    where_document: Optional[Dict[str, Any]] = None
+    # Only count (and sample) the documents that would be deleted
+    dry_run: bool = False
+    batch_size: int = Field(DELETE_BATCH_SIZE, ge=0)
+    workers: int = Field(DELETE_WORKERS, ge=1, le=32)
+
+class CollectionMigrate(BaseModel):
+    target: str
+    # A registered Chroma embedding function (e.g. "sentence_transformer") and its config;
+    # when set, documents are re-embedded, otherwise the stored embeddings are copied
+    embedding_function: Optional[str] = None
+    embedding_config: Dict[str, Any] = {}
+    # Distance metric of the target; the source's when unset
+    space: Optional[Literal["cosine", "l2", "ip"]] = None
+    # HNSW settings such as ef_construction, ef_search or max_neighbors
+    hnsw: Dict[str, Any] = {}
+    batch_size: int = Field(MIGRATION_BATCH_SIZE, ge=1, le=10000)
+    workers: int = Field(MIGRATION_WORKERS, ge=1, le=32)
+    # Continue an interrupted migration into the existing target from its checkpoint
+    resume: bool = False
+
+class DuplicatesRequest(BaseModel):
+    # Minimum cosine similarity for two documents to count as duplicates
+    threshold: float = Field(DEDUP_THRESHOLD, ge=DEDUP_MIN_THRESHOLD, le=1)
+    # "exact" compares every pair; "lsh" only verifies pairs sharing a random-hyperplane bucket
+    method: Literal["auto", "exact", "lsh"] = "auto"
+    filters: List[FilterCondition] = []
+    where: Optional[Dict[str, Any]] = None
+    where_document: Optional[Dict[str, Any]] = None
+    seed: int = 0
+
+class DuplicatesDelete(BaseModel):
+    job_id: str
+    # Indexes into the job's groups; all groups by default. The first id of each group is kept.
+    groups: Optional[List[int]] = None
+
+class ExportRequest(BaseModel):
+    format: Literal["ndjson", "csv", "parquet"] = "ndjson"
+    filters: List[FilterCondition] = []
+    where: Optional[Dict[str, Any]] = None
+    where_document: Optional[Dict[str, Any]] = None
+    include_embeddings: bool = False
+    batch_size: int = Field(EXPORT_BATCH_SIZE, ge=1, le=10000)
+
+class ListingOptions(BaseModel):
+    # Fields returned besides the id; [] lists ids only and skips reading documents entirely
+    include: List[Literal["documents", "metadatas"]] = ["metadatas", "documents"]
+    # Cut documents to this many characters (0 keeps them whole); rows then say whether
+    # they were `truncated`, and POST /api/collections/{name}/get returns the full text
+    preview: int = Field(0, ge=0)
+    # "rows": [{id, document, metadata}, ...]; "columns": {ids: [...], documents: [...], metadatas: [...]}
+    format: Literal["rows", "columns"] = "rows"
+
+class DocumentGet(BaseModel):
+    ids: List[str]
+    include: List[Literal["documents", "metadatas"]] = ["metadatas", "documents"]
+    format: Literal["rows", "columns"] = "rows"
+
+class FilterRequest(ListingOptions):
+    filters: List[FilterCondition] = []
+    # Whether documents must match all filters or any of them
+    match: Literal["all", "any"] = "all"
+    # Raw Chroma-style expressions, combined with `filters` using $and
+    where: Optional[Dict[str, Any]] = None
+    where_document: Optional[Dict[str, Any]] = None
+    page: int = Query(1, ge=1)
+    limit: int = Query(10, ge=1, le=100)
+    # "exact" waits for the (cached) total; "estimate" returns right away with a lower
+    # bound and has_more while the exact total is counted in the background. Exact
+    # requests on collections over FILTER_COUNT_EXACT_MAX_DOCS are answered as estimates
+    count_mode: Literal["exact", "estimate"] = "exact"
+    # "cursor" paging ignores `page` and follows the opaque next/prev tokens instead
+    paging: Literal["page", "cursor"] = "page"
+    cursor: Optional[str] = None
+
+WHERE_OPERATORS = {"$eq", "$ne", "$gt", "$gte", "$lt", "$lte", "$in", "$nin", "$contains", "$not_contains"}
+WHERE_DOCUMENT_OPERATORS = {"$contains", "$not_contains", "$regex", "$not_regex"}
+RANGE_OPERATORS = {"$gt", "$gte", "$lt", "$lte"}
+# Operator each one turns into under $not. Chroma's negative operators also match documents
+# without the key, but ranges have no such form: $not of $gt gives $lte, which skips them.
+NEGATED_OPERATORS = {
+    "$eq": "$ne", "$ne": "$eq", "$gt": "$lte", "$gte": "$lt", "$lt": "$gte", "$lte": "$gt",
+    "$in": "$nin", "$nin": "$in", "$contains": "$not_contains", "$not_contains": "$contains",
+    "$regex": "$not_regex", "$not_regex": "$regex",
+}
+FILTER_OPERATORS = {
+    "equals": "$eq", "not_equals": "$ne", "gt": "$gt", "gte": "$gte", "lt": "$lt", "lte": "$lte",
+    "in": "$in", "not_in": "$nin",
+}
+
+def _filter_error(message: str) -> HTTPException:
+    return HTTPException(status_code=400, detail=f"Invalid filter: {message}")
+
+def _is_scalar(value) -> bool:
+    return isinstance(value, (str, bool, int, float))
+
+def _combine(operator: str, clauses: List[Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+    """
+    Join clauses with $and/$or in canonical form: nested joins of the same kind are
+    flattened, duplicates dropped and the rest sorted. None stands for "match everything".
+    """
+    flat: Dict[str, Dict[str, Any]] = {}
+    for clause in clauses:
+        if clause is None:
+            if operator == "$or":
+                return None
+            continue
+        for part in clause[operator] if list(clause) == [operator] else [clause]:
+            flat[where_key(part)] = part
+    parts = [flat[key] for key in sorted(flat)]
+    if not parts:
+        return None
+    return parts[0] if len(parts) == 1 else {operator: parts}
+
+def _canonical_operand(operator: str, value):
+    if operator in ("$in", "$nin"):
+        if not isinstance(value, list) or not value or not all(_is_scalar(v) for v in value):
+            raise _filter_error(f"{operator} needs a non-empty list of strings, numbers or booleans")
+        if len({type(v) for v in value}) > 1:
+            raise _filter_error(f"{operator} values must all have the same type")
+        unique = {json.dumps(v): v for v in value}
+        return [unique[key] for key in sorted(unique)]
+    if operator in RANGE_OPERATORS:
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise _filter_error(f"{operator} needs a number, got {value!r}")
+        return value
+    # The (not_)exists filter operators compare against None; leave those for Chroma to judge
+    if not _is_scalar(value) and not (value is None and operator in ("$eq", "$ne")):
+        raise _filter_error(f"{operator} needs a string, number or boolean, got {value!r}")
+    return value
+
+def _compile_field(field: str, condition, negate: bool) -> Optional[Dict[str, Any]]:
+    if not isinstance(condition, dict):
+        condition = {"$eq": condition}
+    clauses = []
+    for operator, value in condition.items():
+        if operator == "$not":
+            if not isinstance(value, dict):
+                raise _filter_error(f"$not on '{field}' needs an operator object")
+            clauses.append(_compile_field(field, value, not negate))
+            continue
+        if operator not in WHERE_OPERATORS:
+            raise _filter_error(f"unsupported operator {operator} on '{field}'")
+        value = _canonical_operand(operator, value)
+        if negate:
+            operator = NEGATED_OPERATORS[operator]
+        # A one-element $in is the same filter as $eq
+        if operator in ("$in", "$nin") and len(value) == 1:
+            operator, value = ("$eq" if operator == "$in" else "$ne"), value[0]
+        clauses.append({field: {operator: value}})
+    return _combine("$or" if negate else "$and", clauses)
+
+def compile_where(expression: Optional[Dict[str, Any]], negate: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    Validate a metadata filter and rewrite it into the canonical form Chroma accepts:
+    field shorthands ({"k": v}) become $eq, multi-key objects become $and, $not is
+    pushed down to the operators, and equivalent filters produce identical clauses,
+    so they share cached pages and counts. Raises a 400 HTTPException when invalid.
+    """
+    if not expression:
+        return None
+    if not isinstance(expression, dict):
+        raise _filter_error("where must be an object")
+    clauses = []
+    for key, value in expression.items():
+        if key in ("$and", "$or"):
+            if not isinstance(value, list):
+                raise _filter_error(f"{key} needs a list of expressions")
+            # De Morgan: under $not, $and becomes $or and vice versa
+            operator = key if not negate else ("$or" if key == "$and" else "$and")
+            children = [compile_where(child, negate) if child else None for child in value]
+            clauses.append(_combine(operator, children) if children else None)
+        elif key == "$not":
+            clauses.append(compile_where(value, not negate))
+        elif key.startswith("$"):
+            raise _filter_error(f"unsupported operator {key}")
+        else:
+            clauses.append(_compile_field(key, value, negate))
+    return _combine("$or" if negate else "$and", clauses)
+
+def compile_where_document(expression: Optional[Dict[str, Any]], negate: bool = False) -> Optional[Dict[str, Any]]:
+    """Like compile_where() for full-text filters: $contains/$not_contains/$regex/$not_regex with $and/$or/$not."""
+    if not expression:
+        return None
+    if not isinstance(expression, dict):
+        raise _filter_error("where_document must be an object")
+    clauses = []
+    for operator, value in expression.items():
+        if operator in ("$and", "$or"):
+            if not isinstance(value, list):
+                raise _filter_error(f"{operator} needs a list of expressions")
+            joined = operator if not negate else ("$or" if operator == "$and" else "$and")
+            children = [compile_where_document(child, negate) if child else None for child in value]
+            clauses.append(_combine(joined, children) if children else None)
+        elif operator == "$not":
+            clauses.append(compile_where_document(value, not negate))
+        elif operator in WHERE_DOCUMENT_OPERATORS:
+            if not isinstance(value, str) or not value:
+                raise _filter_error(f"{operator} needs a non-empty string")
+            if operator in ("$regex", "$not_regex"):
+                try:
+                    re.compile(value)
+                except re.error as e:
+                    raise _filter_error(f"bad regular expression {value!r}: {e}")
+            clauses.append({NEGATED_OPERATORS[operator] if negate else operator: value})
+        else:
+            raise _filter_error(f"unsupported where_document operator {operator}")
+    return _combine("$or" if negate else "$and", clauses)
+
+def _filter_value(condition: FilterCondition):
+    value = condition.value
+    if condition.operator in ("in", "not_in") and isinstance(value, str):
+        value = [part.strip() for part in value.split(",") if part.strip()]
+    value_type = condition.value_type
+    if value_type is None and condition.operator in ("gt", "gte", "lt", "lte"):
+        value_type = "number"
+
+    def coerce(v):
+        if not isinstance(v, str) or value_type in (None, "string"):
+            return v
+        if value_type == "bool":
+            if v.strip().lower() not in ("true", "false"):
+                raise _filter_error(f"'{condition.field}' expects true or false, got {v!r}")
+            return v.strip().lower() == "true"
+        try:
+            number = float(v)
+        except ValueError:
+            raise _filter_error(f"'{condition.field}' expects a number, got {v!r}")
+        return int(number) if number.is_integer() and "." not in v and "e" not in v.lower() else number
+
+    if not isinstance(value, list):
+        return coerce(value)
+    values = [coerce(v) for v in value]
+    # Chroma wants one type per list: "1, 2.5" is [1.0, 2.5], not [1, 2.5]
+    if value_type == "number" and any(isinstance(v, float) for v in values):
+        values = [float(v) if isinstance(v, int) and not isinstance(v, bool) else v for v in values]
+    return values
+
+def build_chroma_filter(
+    filters: List[FilterCondition],
+    match: Literal["all", "any"] = "all",
+    where: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Convert a FilterCondition list (joined with $and, or $or for match="any") plus an
+    optional raw where expression into one canonical ChromaDB where clause
+    """
+    conditions = []
+    
+    for filter_condition in filters:
+        field = filter_condition.field
+        operator = filter_condition.operator
+        value = _filter_value(filter_condition)
+        
+        if operator in FILTER_OPERATORS:
+            if value is not None:
+                conditions.append({field: {FILTER_OPERATORS[operator]: value}})
+        elif operator == "contains":
+            if value is not None:
+                conditions.append({field: {"$contains": value}})
+        elif operator == "exists":
+            conditions.append({field: {"$ne": None}})
+        elif operator == "not_exists":
+            conditions.append({field: {"$eq": None}})
+        elif operator == "not_empty":
+            # Field exists and is not empty string
+            conditions.append({"$and": [
+                {field: {"$ne": None}},
+                {field: {"$ne": ""}}
+            ]})
+    
+    expression = {"$or" if match == "any" else "$and": conditions} if conditions else None
+    return _combine("$and", [compile_where(expression), compile_where(where)]) or {}
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson when it is installed, several times faster for large listings."""
+
+    def render(self, content: Any) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+DEFAULT_LISTING = ListingOptions()
+
+def listing_options(include: Optional[str], preview: int, format: str) -> ListingOptions:
+    """ListingOptions from the comma-separated `include` query parameter and friends."""
+    fields = [field.strip() for field in include.split(",") if field.strip()] if include is not None else DEFAULT_LISTING.include
+    unknown = [field for field in fields if field not in ("documents", "metadatas")]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown include field(s): {', '.join(unknown)}")
+    return ListingOptions(include=fields, preview=preview, format=format)
+
+def head_results(results: Dict[str, Any], limit: int) -> Dict[str, Any]:
+    """The first `limit` documents of a collection.get() result."""
+    results = dict(results)
+    for field in ("ids", "documents", "metadatas"):
+        if results.get(field):
+            results[field] = results[field][:limit]
+    return results
+
+def format_documents(results: Dict[str, Any], options: ListingOptions = DEFAULT_LISTING):
+    """Turn a collection.get() result into the row dicts (or columns) returned by the API."""
+    ids = results["ids"]
+    columns: Dict[str, List[Any]] = {"ids": ids}
+    truncated = None
+    if "documents" in options.include:
+        documents = results.get("documents") or [""] * len(ids)
+        if options.preview:
+            truncated = [doc is not None and len(doc) > options.preview for doc in documents]
+            documents = [doc[:options.preview] if doc is not None else doc for doc in documents]
+        columns["documents"] = documents
+    if "metadatas" in options.include:
+        columns["metadatas"] = results.get("metadatas") or [{}] * len(ids)
+    if truncated is not None:
+        columns["truncated"] = truncated
+    if options.format == "columns":
+        return columns
+    names = {"ids": "id", "documents": "document", "metadatas": "metadata", "truncated": "truncated"}
+    fields = [(names[field], values) for field, values in columns.items()]
+    return [{name: values[i] for name, values in fields} for i in range(len(ids))]
+
+def listing_response(results: Dict[str, Any], options: ListingOptions, total: int, page: int, limit: int, **extra) -> Response:
+    """A CollectionData payload serialized directly, skipping per-row model validation."""
+    content = {
+        "data": format_documents(results, options),
+        "total": total,
+        "page": page,
+        "limit": limit,
+        "total_exact": True,
+        "has_more": None,
+        "next_cursor": None,
+        "prev_cursor": None,
+    }
+    content.update(extra)
+    return FastJSONResponse(content)
+
+def encode_cursor(collection_name: str, where: Dict[str, Any], offset: int,
+                  where_document: Optional[Dict[str, Any]] = None) -> str:
+    """Opaque paging token: the next offset plus a fingerprint of the collection and filter."""
+    fingerprint = hashlib.sha1(f"{collection_name}|{where_key(where, where_document)}".encode()).hexdigest()[:12]
+    payload = json.dumps({"o": offset, "f": fingerprint}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+def decode_cursor(cursor: str, collection_name: str, where: Dict[str, Any],
+                  where_document: Optional[Dict[str, Any]] = None) -> int:
+    """Return the offset stored in `cursor`, rejecting tokens issued for another collection or filter."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        offset = int(payload["o"])
+        fingerprint = payload["f"]
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    expected = hashlib.sha1(f"{collection_name}|{where_key(where, where_document)}".encode()).hexdigest()[:12]
+    if fingerprint != expected or offset < 0:
+        raise HTTPException(status_code=400, detail="Cursor does not match this collection and filter")
+    return offset
+
+def _page_fetch_task(collection_name: str, collection, where: Dict[str, Any], offset: int, limit: int,
+                     where_document: Optional[Dict[str, Any]] = None,
+                     include: List[str] = DEFAULT_LISTING.include) -> asyncio.Task:
+    key = (collection_scope(collection_name), collection_version(collection_name), where_key(where, where_document),
+           offset, limit, tuple(sorted(include)))
+    task = page_fetch_tasks.get(key)
+    if task is not None:
+        return task
+
+    async def run():
+        try:
+            get_params = {"limit": limit, "offset": offset, "include": list(include)}
+            get_params.update(filter_params(where, where_document))
+            results = await chroma_call(collection.get, **get_params)
+            page_cache.set(key, results)
+            return results
+        finally:
+            page_fetch_tasks.pop(key, None)
+
+    task = asyncio.create_task(run())
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+    page_fetch_tasks[key] = task
+    return task
+
+async def fetch_page(collection_name: str, collection, where: Dict[str, Any], offset: int, limit: int,
+                     where_document: Optional[Dict[str, Any]] = None,
+                     include: List[str] = DEFAULT_LISTING.include) -> Dict[str, Any]:
+    """Get one page, served from the prefetch cache or an in-flight prefetch when possible."""
+    key = (collection_scope(collection_name), collection_version(collection_name), where_key(where, where_document),
+           offset, limit, tuple(sorted(include)))
+    cached = page_cache.get(key)
+    if cached is not None:
+        return cached
+    return await asyncio.shield(_page_fetch_task(collection_name, collection, where, offset, limit, where_document, include))
+
+async def cursor_page(collection_name: str, collection, where: Dict[str, Any], cursor: Optional[str], limit: int,
+                      where_document: Optional[Dict[str, Any]] = None,
+                      options: ListingOptions = DEFAULT_LISTING) -> Response:
+    """
+    Serve one page in cursor mode. Chroma has no ordered key to seek on, so the cursor
+    carries the offset; depth stays cheap because the following page is prefetched
+    in the background while the client renders this one.
+    """
+    offset = decode_cursor(cursor, collection_name, where, where_document) if cursor else 0
+
+    # One extra row tells us whether a next page exists
+    results = await fetch_page(collection_name, collection, where, offset, limit + 1, where_document, options.include)
+    has_more = len(results["ids"]) > limit
+    results = head_results(results, limit)
+    if has_more:
+        _page_fetch_task(collection_name, collection, where, offset + limit, limit + 1, where_document, options.include)
+
+    total_exact = True
+    if where or where_document:
+        total_count = cached_filtered_count(collection_name, where, where_document)
+        if total_count is None:
+            filtered_count_task(collection_name, collection, where, where_document)
+            total_exact = False
+            total_count = offset + len(results["ids"]) + (1 if has_more else 0)
+    else:
+        total_count = await chroma_call(collection.count)
+
+    return listing_response(
+        results,
+        options,
+        total=total_count,
+        page=offset // limit + 1,
+        limit=limit,
+        total_exact=total_exact,
+        has_more=has_more,
+        next_cursor=encode_cursor(collection_name, where, offset + limit, where_document) if has_more else None,
+        prev_cursor=encode_cursor(collection_name, where, max(offset - limit, 0), where_document) if offset > 0 else None
+    )
+
+async def iter_collection_batches(collection, where: Optional[Dict[str, Any]], include: List[str], batch_size: int,
+                                  where_document: Optional[Dict[str, Any]] = None, offset: int = 0):
+    """Yield collection.get() results of up to `batch_size` documents, from `offset` until the collection is exhausted."""
+    while True:
+        get_params = {"limit": batch_size, "offset": offset, "include": include}
+        get_params.update(filter_params(where, where_document))
+        batch = await chroma_call(collection.get, **get_params)
+        n = len(batch["ids"])
+        if n:
+            yield batch
+        if n < batch_size:
+            return
+        offset += n
+
+def _to_list(vector) -> List[float]:
+    return vector.tolist() if hasattr(vector, "tolist") else list(vector)
+
+def _export_rows(batch: Dict[str, Any], include_embeddings: bool):
+    documents = batch.get("documents")
+    metadatas = batch.get("metadatas")
+    embeddings = batch.get("embeddings") if include_embeddings else None
+    for i, doc_id in enumerate(batch["ids"]):
+        row = {
+            "id": doc_id,
+            "document": documents[i] if documents is not None else None,
+            "metadata": metadatas[i] if metadatas is not None else None,
+        }
+        if embeddings is not None:
+            row["embedding"] = _to_list(embeddings[i])
+        yield row
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that hands back whatever was written since the last drain()."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+async def export_stream(collection_name: str, collection, where: Dict[str, Any], export: ExportRequest,
+                        where_document: Optional[Dict[str, Any]] = None):
+    """
+    Stream a collection in the requested format, one Chroma batch at a time.
+    Only the current batch is held in memory, and the next one is not read until
+    the previous chunk has been handed to the client.
+    """
+    include = ["documents", "metadatas"] + (["embeddings"] if export.include_embeddings else [])
+    batches = iter_collection_batches(collection, where, include, export.batch_size, where_document)
+    exported = 0
+    try:
+        if export.format == "ndjson":
+            async for batch in batches:
+                lines = [json.dumps(row, ensure_ascii=False, default=str) for row in _export_rows(batch, export.include_embeddings)]
+                exported += len(lines)
+                yield ("\n".join(lines) + "\n").encode("utf-8")
+        elif export.format == "csv":
+            header = ["id", "document", "metadata"] + (["embedding"] if export.include_embeddings else [])
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(header)
+            async for batch in batches:
+                for row in _export_rows(batch, export.include_embeddings):
+                    values = [row["id"], row["document"] or "", json.dumps(row["metadata"] or {}, ensure_ascii=False, default=str)]
+                    if export.include_embeddings:
+                        values.append(json.dumps(row["embedding"]))
+                    writer.writerow(values)
+                    exported += 1
+                yield buffer.getvalue().encode("utf-8")
+                buffer.seek(0)
+                buffer.truncate(0)
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            fields = [("id", pa.string()), ("document", pa.string()), ("metadata", pa.string())]
+            if export.include_embeddings:
+                fields.append(("embedding", pa.list_(pa.float32())))
+            schema = pa.schema(fields)
+            sink = _ChunkSink()
+            writer = pq.ParquetWriter(sink, schema)
+            async for batch in batches:
+                rows = list(_export_rows(batch, export.include_embeddings))
+                columns = {
+                    "id": [row["id"] for row in rows],
+                    "document": [row["document"] for row in rows],
+                    "metadata": [json.dumps(row["metadata"] or {}, ensure_ascii=False, default=str) for row in rows],
+                }
+                if export.include_embeddings:
+                    columns["embedding"] = [row["embedding"] for row in rows]
+                # Each Chroma batch becomes one row group
+                writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+                exported += len(rows)
+                yield sink.drain()
+            writer.close()
+            yield sink.drain()
+        logger.info(f"Exported {exported} documents from collection {collection_name} as {export.format}")
+    except Exception as e:
+        # Headers are already sent, so the client only sees a truncated body
+        logger.error(f"Export of collection {collection_name} failed after {exported} documents: {e}")
+        raise
+
+def _embedding_model_id(collection) -> Optional[str]:
+    """Identify the model a collection embeds queries with, or None if it cannot be determined."""
+    try:
+        embedding_function = None
+        configuration = getattr(collection, "configuration", None)
+        if isinstance(configuration, dict):
+            embedding_function = configuration.get("embedding_function")
+        if embedding_function is None:
+            embedding_function = getattr(collection, "_embedding_function", None)
+        if embedding_function is None:
+            return None
+        model_id = type(embedding_function).__qualname__
+        if hasattr(embedding_function, "name"):
+            model_id = embedding_function.name()
+        if hasattr(embedding_function, "get_config"):
+            model_id += json.dumps(embedding_function.get_config(), sort_keys=True, default=str)
+        return model_id
+    except Exception:
+        return None
+
+def _embed_query_texts_sync(collection, texts: List[str]):
+    if hasattr(collection, "_embed"):
+        return collection._embed(input=texts, is_query=True)
+    return collection._embedding_function(input=texts)
+
+async def embed_query_texts(collection, texts: List[str]) -> Optional[List[np.ndarray]]:
+    """
+    Embed query texts through the embedding cache, computing only the misses with the
+    collection's own embedding function. Returns None when the cache is disabled or
+    the collection's model cannot be identified, so callers fall back to query_texts.
+    """
+    if embedding_cache is None:
+        return None
+    model_id = _embedding_model_id(collection)
+    if model_id is None:
+        return None
+
+    keys = [hashlib.sha256(f"{model_id}\0{text}".encode()).hexdigest() for text in texts]
+    vectors: List[Optional[np.ndarray]] = [embedding_cache.get(key) for key in keys]
+    missing = [i for i, vector in enumerate(vectors) if vector is None]
+    if missing:
+        loop = asyncio.get_running_loop()
+        _ensure_chroma_runtime()
+        computed = await loop.run_in_executor(
+            chroma_executor, _embed_query_texts_sync, collection, [texts[i] for i in missing]
+        )
+        for i, vector in zip(missing, computed):
+            vector = np.asarray(vector, dtype=np.float32)
+            vectors[i] = vector
+            embedding_cache.put(keys[i], vector)
+    return vectors
+
+def _query_key(text: Optional[str], embedding: Optional[List[float]]) -> str:
+    if text is not None:
+        return "t:" + text
+    return "e:" + hashlib.sha1(json.dumps(embedding).encode()).hexdigest()
+
+async def run_queries(
+    collection_name: str,
+    collection,
+    query_texts: Optional[List[str]] = None,
+    query_embeddings: Optional[List[List[float]]] = None,
+    n_results: int = 5,
+    where: Optional[Dict[str, Any]] = None,
+    where_document: Optional[Dict[str, Any]] = None
+):
+    """
+    Run many similarity queries against one collection. Cached answers are reused and
+    the rest are sent in chunks of QUERY_BATCH_SIZE per collection.query call, with
+    chunks running concurrently. Returns (one result list per query, cache hits).
+    """
+    count = len(query_texts) if query_texts is not None else len(query_embeddings)
+    scope = collection_scope(collection_name)
+    version = collection_version(collection_name)
+    filter_key = (where_key(where), where_key(where_document), n_results)
+    keys = [
+        (scope, version, _query_key(
+            query_texts[i] if query_texts is not None else None,
+            query_embeddings[i] if query_embeddings is not None else None
+        )) + filter_key
+        for i in range(count)
+    ]
+
+    results: List[Optional[List[Dict[str, Any]]]] = [query_result_cache.get(key) for key in keys]
+    missing = [i for i, cached in enumerate(results) if cached is None]
+    hits = count - len(missing)
+
+    async def run_chunk(indices: List[int]):
+        query_params: Dict[str, Any] = {
+            "n_results": n_results,
+            "include": ["metadatas", "documents", "distances"]
+        }
+        if query_texts is not None:
+            texts = [query_texts[i] for i in indices]
+            embeddings = None
+            try:
+                embeddings = await embed_query_texts(collection, texts)
+            except Exception as e:
+                logger.warning(f"Embedding cache lookup failed for {collection_name}, sending query texts: {e}")
+            if embeddings is not None:
+                query_params["query_embeddings"] = embeddings
+            else:
+                query_params["query_texts"] = texts
+        else:
+            query_params["query_embeddings"] = [query_embeddings[i] for i in indices]
+        if where:
+            query_params["where"] = where
+        if where_document:
+            query_params["where_document"] = where_document
+        response = await chroma_call(collection.query, **query_params)
+
+        for position, index in enumerate(indices):
+            documents = []
+            for i in range(len(response["ids"][position])):
+                documents.append({
+                    "id": response["ids"][position][i],
+                    "document": response["documents"][position][i] if response["documents"] else "",
+                    "metadata": response["metadatas"][position][i] if response["metadatas"] else {},
+                    "distance": response["distances"][position][i] if response["distances"] else None
+                })
+            results[index] = documents
+            query_result_cache.set(keys[index], documents)
+
+    chunks = [missing[i:i + QUERY_BATCH_SIZE] for i in range(0, len(missing), QUERY_BATCH_SIZE)]
+    await asyncio.gather(*(run_chunk(chunk) for chunk in chunks))
+    return results, hits
+
+FACET_TYPES = {str: "string", bool: "bool", int: "int", float: "float"}
+
+class FacetIndex:
+    """
+    Metadata keys of one collection with their value types and per-value document
+    counts. Counts are kept per (type, value) so that e.g. 1 and True stay apart.
+    """
+
+    def __init__(self, version: int):
+        self.version = version
+        self.status = "building"
+        self.error: Optional[str] = None
+        self.documents = 0
+        self.keys_exact = True
+        self.fields: Dict[str, Dict[str, Any]] = {}
+
+    def apply(self, metadatas: List[Optional[Dict[str, Any]]], sign: int = 1):
+        """Count (sign=1) or uncount (sign=-1) the metadata of added or removed documents."""
+        for metadata in metadatas:
+            self.documents += sign
+            for key, value in (metadata or {}).items():
+                field = self.fields.get(key)
+                if field is None:
+                    if sign < 0:
+                        continue
+                    if len(self.fields) >= FACET_MAX_KEYS:
+                        self.keys_exact = False
+                        continue
+                    field = self.fields[key] = {"count": 0, "types": {}, "values": {}, "exact": True}
+                value_type = FACET_TYPES.get(type(value), "list" if isinstance(value, list) else "other")
+                if value_type in ("list", "other"):
+                    value = json.dumps(value, sort_keys=True, default=str)
+                field["count"] += sign
+                field["types"][value_type] = field["types"].get(value_type, 0) + sign
+                if field["types"][value_type] <= 0:
+                    del field["types"][value_type]
+                values = field["values"]
+                value_key = (value_type, value)
+                if value_key in values:
+                    values[value_key] += sign
+                    if values[value_key] <= 0:
+                        del values[value_key]
+                elif sign > 0:
+                    if len(values) < FACET_MAX_VALUES:
+                        values[value_key] = 1
+                    else:
+                        field["exact"] = False
+                if field["count"] <= 0:
+                    del self.fields[key]
+
+    def facet(self, key: str, top_k: int) -> FacetField:
+        field = self.fields[key]
+        values = field["values"]
+        top = sorted(values.items(), key=lambda item: -item[1])[:top_k] if top_k else []
+        return FacetField(
+            key=key,
+            count=field["count"],
+            types=dict(field["types"]),
+            distinct=len(values),
+            distinct_exact=field["exact"],
+            top=[FacetValue(value=value, type=value_type, count=count) for (value_type, value), count in top]
+        )
+
+async def _build_facet_index(collection_name: str, collection, index: FacetIndex):
+    """Scan the collection's metadata in batches into `index` and publish it once done."""
+    scope = collection_scope(collection_name)
+    try:
+        async for batch in iter_collection_batches(collection, None, ["metadatas"], FACET_SCAN_BATCH_SIZE):
+            index.apply(batch.get("metadatas") or [None] * len(batch["ids"]))
+        index.status = "ready"
+        logger.info(f"Facet index for {collection_name} built: {index.documents} documents, {len(index.fields)} keys")
+    except Exception as e:
+        index.status = "failed"
+        index.error = str(e)
+        logger.error(f"Failed to build facet index for collection {collection_name}: {e}")
+    finally:
+        facet_build_tasks.pop(scope, None)
+    # A rebuild keeps serving the previous index until this one is complete
+    if index.status == "ready" or facet_indexes.get(scope) is None:
+        facet_indexes.set(scope, index)
+
+def facet_index_task(collection_name: str, collection) -> asyncio.Task:
+    """Start (or join) the background scan of `collection_name`'s metadata."""
+    scope = collection_scope(collection_name)
+    task = facet_build_tasks.get(scope)
+    if task is None:
+        index = FacetIndex(collection_version(collection_name))
+        task = asyncio.create_task(_build_facet_index(collection_name, collection, index))
+        facet_build_tasks[scope] = task
+        if facet_indexes.get(scope) is None:
+            # First build: expose the partial index so callers can watch it fill up
+            facet_indexes.set(scope, index)
+    return task
+
+def facet_index_is_current(collection_name: str) -> bool:
+    index = facet_indexes.get(collection_scope(collection_name))
+    return index is not None and index.status == "ready" and index.version == collection_version(collection_name)
+
+def update_facet_index(collection_name: str, added=None, removed=None):
+    """
+    Apply a dashboard write to the facet index. Call right after invalidate_collection_caches();
+    an index that was not current before the write is left stale and rescanned on next use.
+    """
+    index = facet_indexes.get(collection_scope(collection_name))
+    version = collection_version(collection_name)
+    if index is None or index.status != "ready" or index.version != version - 1:
+        return
+    if removed:
+        index.apply(removed, -1)
+    if added:
+        index.apply(added, 1)
+    index.version = version
+
+# Lower bucket edges of the document length (characters) and embedding norm histograms
+STATS_LENGTH_EDGES = (0, 1, 16, 64, 256, 1024, 4096, 16384, 65536)
+STATS_NORM_EDGES = (0, 0.5, 0.9, 0.99, 1.01, 1.1, 2, 10, 100)
+
+def _histogram(edges, values) -> np.ndarray:
+    counts = np.zeros(len(edges), dtype=np.int64)
+    if len(values):
+        np.add.at(counts, np.searchsorted(edges, values, side="right") - 1, 1)
+    return counts
+
+def _histogram_buckets(edges, counts) -> List[HistogramBucket]:
+    return [
+        HistogramBucket(min=edge, max=edges[i + 1] if i + 1 < len(edges) else None, count=int(count))
+        for i, (edge, count) in enumerate(zip(edges, counts))
+    ]
+
+class CollectionStats:
+    """
+    Size and shape of one collection as sums and fixed-bucket histograms, so documents
+    the dashboard adds or deletes can be applied (or taken back) without a rescan.
+    """
+
+    def __init__(self, version: int):
+        self.version = version
+        self.status = "scanning"
+        self.error: Optional[str] = None
+        self.scanned_at: Optional[float] = None
+        self.documents = 0
+        self.text_documents = 0
+        self.text_bytes = 0
+        self.text_chars = 0
+        self.lengths = np.zeros(len(STATS_LENGTH_EDGES), dtype=np.int64)
+        self.metadata_documents = 0
+        self.keys: Dict[str, int] = {}
+        self.keys_exact = True
+        self.embedded = 0
+        self.dimensions: Dict[int, int] = {}
+        self.norm_sum = 0.0
+        self.norm_sq_sum = 0.0
+        self.norms = np.zeros(len(STATS_NORM_EDGES), dtype=np.int64)
+
+    def apply(self, batch: Dict[str, Any], sign: int = 1):
+        """Count (sign=1) or uncount (sign=-1) a get()-shaped batch of documents."""
+        n = len(batch["ids"])
+        self.documents += sign * n
+
+        texts = [document for document in (batch.get("documents") or []) if document is not None]
+        lengths = [len(text) for text in texts]
+        self.text_documents += sign * len(texts)
+        self.text_chars += sign * sum(lengths)
+        self.text_bytes += sign * sum(len(text.encode()) for text in texts)
+        self.lengths += sign * _histogram(STATS_LENGTH_EDGES, lengths)
+
+        for metadata in batch.get("metadatas") or []:
+            if not metadata:
+                continue
+            self.metadata_documents += sign
+            for key in metadata:
+                if key not in self.keys:
+                    if sign < 0:
+                        continue
+                    if len(self.keys) >= FACET_MAX_KEYS:
+                        self.keys_exact = False
+                        continue
+                    self.keys[key] = 0
+                self.keys[key] += sign
+                if self.keys[key] <= 0:
+                    del self.keys[key]
+
+        embeddings = batch.get("embeddings")
+        if embeddings is None or not len(embeddings):
+            return
+        norms = np.array([np.linalg.norm(np.asarray(vector, dtype=np.float64)) for vector in embeddings])
+        for vector in embeddings:
+            dimension = len(vector)
+            self.dimensions[dimension] = self.dimensions.get(dimension, 0) + sign
+            if self.dimensions[dimension] <= 0:
+                del self.dimensions[dimension]
+        self.embedded += sign * len(norms)
+        self.norm_sum += sign * float(norms.sum())
+        self.norm_sq_sum += sign * float((norms ** 2).sum())
+        self.norms += sign * _histogram(STATS_NORM_EDGES, norms)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "scanned_at": self.scanned_at,
+            "documents": self.documents,
+            "text_documents": self.text_documents,
+            "text_bytes": self.text_bytes,
+            "text_chars": self.text_chars,
+            "lengths": self.lengths.tolist(),
+            "metadata_documents": self.metadata_documents,
+            "keys": self.keys,
+            "keys_exact": self.keys_exact,
+            "embedded": self.embedded,
+            "dimensions": {str(dimension): count for dimension, count in self.dimensions.items()},
+            "norm_sum": self.norm_sum,
+            "norm_sq_sum": self.norm_sq_sum,
+            "norms": self.norms.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], version: int) -> "CollectionStats":
+        stats = cls(version)
+        stats.status = "ready"
+        for key, value in data.items():
+            setattr(stats, key, value)
+        stats.lengths = np.asarray(data["lengths"], dtype=np.int64)
+        stats.norms = np.asarray(data["norms"], dtype=np.int64)
+        stats.dimensions = {int(dimension): count for dimension, count in data["dimensions"].items()}
+        return stats
+
+    def response(self, collection_name: str, stale: bool) -> CollectionStatsResponse:
+        mean_norm = self.norm_sum / self.embedded if self.embedded else None
+        return CollectionStatsResponse(
+            collection=collection_name,
+            status=self.status,
+            stale=stale,
+            documents=self.documents,
+            scanned_at=self.scanned_at,
+            text=TextStats(
+                documents=self.text_documents,
+                bytes=self.text_bytes,
+                mean_length=round(self.text_chars / self.text_documents, 2) if self.text_documents else None,
+                length_histogram=_histogram_buckets(STATS_LENGTH_EDGES, self.lengths)
+            ),
+            metadata=MetadataStats(
+                documents=self.metadata_documents,
+                keys=dict(sorted(self.keys.items(), key=lambda item: -item[1])),
+                coverage={key: round(count / self.documents, 4) for key, count in self.keys.items()} if self.documents else {},
+                keys_exact=self.keys_exact
+            ),
+            embeddings=EmbeddingStats(
+                count=self.embedded,
+                dimensions=self.dimensions,
+                mean_norm=round(mean_norm, 6) if mean_norm is not None else None,
+                std_norm=round(max(self.norm_sq_sum / self.embedded - mean_norm ** 2, 0) ** 0.5, 6) if self.embedded else None,
+                norm_histogram=_histogram_buckets(STATS_NORM_EDGES, self.norms)
+            ),
+            message=self.error
+        )
+
+def read_json_file(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def write_json_file(path: str, data: Dict[str, Any]):
+    """Replace the file atomically so an interruption never leaves a torn file."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(partial, "w") as f:
+        json.dump(data, f)
+    os.replace(partial, path)
+
+def stats_path(collection_name: str) -> Optional[str]:
+    if not STATS_DIR:
+        return None
+    key = json.dumps(list(collection_scope(collection_name)))
+    return os.path.join(STATS_DIR, hashlib.sha256(key.encode()).hexdigest()[:32] + ".json")
+
+def persist_collection_stats(collection_name: str, stats: CollectionStats):
+    """Save finished stats in the background; losing a write only costs a rescan."""
+    path = stats_path(collection_name)
+    if path is None or stats.status != "ready":
+        return
+    future = asyncio.get_running_loop().run_in_executor(None, write_json_file, path, stats.to_dict())
+    future.add_done_callback(lambda f: f.exception() and logger.warning(
+        f"Could not persist stats of collection {collection_name}: {f.exception()}"))
+
+async def load_collection_stats(collection_name: str, collection) -> Optional[CollectionStats]:
+    """
+    Stats persisted by an earlier run. Versions do not survive restarts, so they count as
+    current only while recent and matching the collection's count; otherwise they are
+    returned as stale (version -1) to show while a rescan runs.
+    """
+    path = stats_path(collection_name)
+    if path is None:
+        return None
+    data = await asyncio.get_running_loop().run_in_executor(None, read_json_file, path)
+    if not data:
+        return None
+    try:
+        stats = CollectionStats.from_dict(data, collection_version(collection_name))
+    except (KeyError, TypeError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable stats of collection {collection_name}: {e}")
+        return None
+    if time.time() - (stats.scanned_at or 0) > STATS_TTL or stats.documents != await chroma_call(collection.count):
+        stats.version = -1
+    return stats
+
+async def _scan_collection_stats(collection_name: str, collection, stats: CollectionStats):
+    """Scan the whole collection in throttled batches into `stats` and publish them once done."""
+    scope = collection_scope(collection_name)
+    try:
+        async for batch in iter_collection_batches(collection, None, ["documents", "metadatas", "embeddings"],
+                                                   STATS_SCAN_BATCH_SIZE):
+            stats.apply(batch)
+            if STATS_SCAN_DELAY > 0:
+                await asyncio.sleep(STATS_SCAN_DELAY)
+        stats.status = "ready"
+        stats.scanned_at = time.time()
+        logger.info(f"Stats for {collection_name} computed: {stats.documents} documents, {stats.text_bytes} text bytes")
+    except Exception as e:
+        stats.status = "failed"
+        stats.error = str(e)
+        logger.error(f"Failed to compute stats for collection {collection_name}: {e}")
+    finally:
+        stats_scan_tasks.pop(scope, None)
+    # A rescan keeps serving the previous stats until it is complete
+    if stats.status == "ready" or collection_stats.get(scope) is None:
+        collection_stats.set(scope, stats)
+    persist_collection_stats(collection_name, stats)
+
+def collection_stats_task(collection_name: str, collection) -> asyncio.Task:
+    """Start (or join) the background stats scan of `collection_name`."""
+    scope = collection_scope(collection_name)
+    task = stats_scan_tasks.get(scope)
+    if task is None:
+        stats = CollectionStats(collection_version(collection_name))
+        task = asyncio.create_task(_scan_collection_stats(collection_name, collection, stats))
+        stats_scan_tasks[scope] = task
+        if collection_stats.get(scope) is None:
+            # First scan: expose the partial stats so callers can watch them fill up
+            collection_stats.set(scope, stats)
+    return task
+
+def collection_stats_are_current(collection_name: str) -> bool:
+    stats = collection_stats.get(collection_scope(collection_name))
+    return stats is not None and stats.status == "ready" and stats.version == collection_version(collection_name)
+
+def update_collection_stats(collection_name: str, added=None, removed=None):
+    """
+    Apply a dashboard write (get()-shaped batches) to the collection stats. Like
+    update_facet_index(), call right after invalidate_collection_caches(). Without a
+    delta the stats are left a version behind, so the next read rescans them.
+    """
+    stats = collection_stats.get(collection_scope(collection_name))
+    version = collection_version(collection_name)
+    if stats is None or stats.status != "ready" or stats.version != version - 1:
+        return
+    if added is None and removed is None:
+        return
+    if removed:
+        stats.apply(removed, -1)
+    if added:
+        stats.apply(added, 1)
+    stats.version = version
+    persist_collection_stats(collection_name, stats)
+
+def _sample_mask(ids: List[str], rate: float, seed: int) -> Optional[np.ndarray]:
+    """Keep each id with probability `rate`, decided by a hash so every pass picks the same ids."""
+    if rate >= 1:
+        return None
+    salt = seed.to_bytes(8, "little", signed=True)
+    threshold = int(rate * 2 ** 64)
+    return np.fromiter(
+        (int.from_bytes(hashlib.blake2b(doc_id.encode(), digest_size=8, salt=salt).digest(), "little") < threshold
+         for doc_id in ids),
+        dtype=bool, count=len(ids)
+    )
+
+def _batch_vectors(batch: Dict[str, Any], mask: Optional[np.ndarray]):
+    ids = batch["ids"]
+    vectors = np.asarray(batch["embeddings"], dtype=np.float32).reshape(len(ids), -1)
+    if mask is not None:
+        ids = [doc_id for doc_id, keep in zip(ids, mask) if keep]
+        vectors = vectors[mask]
+    return ids, vectors
+
+def _principal_axes(total: np.ndarray, gram: np.ndarray, n: int):
+    """Mean, top-2 principal axes and their explained variance ratios from sum(x) and sum(x x^T)."""
+    mean = total / max(n, 1)
+    covariance = gram / max(n, 1) - np.outer(mean, mean)
+    eigenvalues, eigenvectors = np.linalg.eigh(covariance)
+    order = np.argsort(eigenvalues)[::-1][:2]
+    variance = max(float(eigenvalues.clip(min=0).sum()), 1e-12)
+    return mean.astype(np.float32), eigenvectors[:, order].astype(np.float32), [
+        float(eigenvalues[i]) / variance for i in order
+    ]
+
+async def compute_projection(collection, where: Dict[str, Any], where_document: Optional[Dict[str, Any]],
+                             method: str, sample: int, seed: int) -> Dict[str, Any]:
+    """
+    Project a collection's embeddings to 2D, reading them in PROJECTION_BATCH_SIZE batches.
+    Sampled vectors are kept for a single pass while they fit in PROJECTION_MEMORY_BYTES;
+    past that, PCA accumulates the covariance on a first pass and projects on a second.
+    """
+    loop = asyncio.get_running_loop()
+    if where or where_document:
+        matching = await count_matching(collection, where, where_document)
+    else:
+        matching = await chroma_call(collection.count)
+    rate = sample / matching if sample and matching else 1.0
+
+    def batches():
+        return iter_collection_batches(collection, where, ["embeddings"], PROJECTION_BATCH_SIZE, where_document)
+
+    ids: List[str] = []
+    kept: List[np.ndarray] = []
+    held = 0
+    spilled = False
+    n = 0
+    total = gram = axes = None
+    explained = None
+
+    async for batch in batches():
+        batch_ids, vectors = _batch_vectors(batch, _sample_mask(batch["ids"], rate, seed))
+        if not batch_ids:
+            continue
+        if method == "random":
+            # No statistics needed: project each batch as it arrives
+            if axes is None:
+                rng = np.random.default_rng(seed)
+                axes = (rng.standard_normal((vectors.shape[1], 2)) / np.sqrt(vectors.shape[1])).astype(np.float32)
+            ids.extend(batch_ids)
+            kept.append(vectors @ axes)
+            continue
+        n += len(batch_ids)
+        if total is None:
+            total = np.zeros(vectors.shape[1], dtype=np.float64)
+            gram = np.zeros((vectors.shape[1], vectors.shape[1]), dtype=np.float64)
+        total += vectors.sum(axis=0, dtype=np.float64)
+        gram += await loop.run_in_executor(None, lambda v=vectors: v.T.astype(np.float64) @ v)
+        if not spilled:
+            ids.extend(batch_ids)
+            kept.append(vectors)
+            held += vectors.nbytes
+            if held > PROJECTION_MEMORY_BYTES:
+                # Too big to hold: finish the statistics, then project on a second pass
+                spilled = True
+                ids, kept = [], []
+
+    if method == "random" or n == 0:
+        coords = np.concatenate(kept) if kept else np.zeros((0, 2), dtype=np.float32)
+    else:
+        # A d x d eigendecomposition takes seconds for large embeddings; keep it off the event loop
+        mean, axes, explained = await loop.run_in_executor(None, _principal_axes, total, gram, n)
+        if not spilled:
+            coords = await loop.run_in_executor(None, lambda: (np.concatenate(kept) - mean) @ axes)
+        else:
+            parts = []
+            async for batch in batches():
+                batch_ids, vectors = _batch_vectors(batch, _sample_mask(batch["ids"], rate, seed))
+                ids.extend(batch_ids)
+                parts.append(await loop.run_in_executor(None, lambda v=vectors: (v - mean) @ axes))
+            coords = np.concatenate(parts) if parts else np.zeros((0, 2), dtype=np.float32)
+
+    return {
+        "ids": ids,
+        "coords": np.ascontiguousarray(coords, dtype=np.float32),
+        "method": method,
+        "matching": matching,
+        "explained_variance": explained,
+    }
+
+async def get_projection(collection_name: str, collection, request: ProjectionRequest,
+                         where: Dict[str, Any], where_document: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """A cached projection, else the result of an identical running computation, else a new one."""
+    key = (collection_scope(collection_name), collection_version(collection_name), where_key(where, where_document),
+           request.method, request.sample, request.seed)
+    result = projection_cache.get(key)
+    if result is not None:
+        return result
+    task = projection_tasks.get(key)
+    if task is None:
+        async def run():
+            try:
+                result = await compute_projection(collection, where, where_document, request.method, request.sample, request.seed)
+                projection_cache.set(key, result)
+                return result
+            finally:
+                projection_tasks.pop(key, None)
+
+        task = asyncio.create_task(run())
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        projection_tasks[key] = task
+    # Shielded: a client giving up does not throw away work others may be waiting for
+    return await asyncio.shield(task)
+
+def projection_body(result: Dict[str, Any]) -> bytes:
+    """
+    Binary projection: a 4-byte little-endian header length, the JSON header (padded with
+    spaces to a multiple of 4 bytes) and then count x 2 little-endian float32 coordinates.
+    """
+    header = json.dumps({
+        "count": len(result["ids"]),
+        "method": result["method"],
+        "matching": result["matching"],
+        "explained_variance": result["explained_variance"],
+        "ids": result["ids"],
+    }, separators=(",", ":")).encode()
+    header += b" " * (-(len(header) + 4) % 4)
+    return len(header).to_bytes(4, "little") + header + result["coords"].astype("<f4").tobytes()
+
+# Background jobs by id (oldest first) and the tasks running them
+jobs: "OrderedDict[str, JobStatus]" = OrderedDict()
+job_tasks: Dict[str, asyncio.Task] = {}
+# Running migration job ids by checkpoint file, so one migration never runs twice at once
+migration_jobs: Dict[str, str] = {}
+
+def record_job_error(job: JobStatus, error: Dict[str, Any]):
+    if len(job.errors) < JOB_MAX_ERRORS:
+        job.errors.append(error)
+
+def update_job_progress(job: JobStatus, processed: int = 0, failed: int = 0, progress: Optional[float] = None):
+    """Add to the job's counters and refresh its throughput, progress and ETA."""
+    job.processed += processed
+    job.failed += failed
+    if progress is not None:
+        job.progress = round(min(progress, 1.0), 4)
+    elif job.total:
+        job.progress = round(min((job.processed + job.failed) / job.total, 1.0), 4)
+    elapsed = time.time() - (job.started_at or job.created_at)
+    if elapsed > 0:
+        job.rate = round(job.processed / elapsed, 2)
+    if job.progress:
+        job.eta_seconds = round(elapsed * (1 - job.progress) / job.progress, 1)
+
+def start_job(kind: str, collection_name: str, runner, cleanup=None) -> JobStatus:
+    """
+    Register a job and run `runner(job)` in the background. The runner updates the
+    job as it goes; exceptions mark it failed and cancellation marks it cancelled.
+    """
+    job = JobStatus(id=uuid.uuid4().hex, kind=kind, collection=collection_name, created_at=time.time())
+    jobs[job.id] = job
+    finished = [job_id for job_id, j in jobs.items() if j.finished_at is not None]
+    for job_id in finished[:max(len(jobs) - JOB_HISTORY_SIZE, 0)]:
+        jobs.pop(job_id, None)
+
+    async def run():
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            await runner(job)
+            job.status = "completed"
+            job.progress = 1.0
+            job.eta_seconds = 0.0
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+        except Exception as e:
+            logger.error(f"{kind} job {job.id} on collection {collection_name} failed: {e}")
+            job.status = "failed"
+            job.message = str(e)
+        finally:
+            job.finished_at = time.time()
+            job_tasks.pop(job.id, None)
+            if cleanup is not None:
+                cleanup()
+            logger.info(f"{kind} job {job.id} on collection {collection_name} {job.status}: "
+                        f"{job.processed} processed, {job.failed} failed")
+
+    job_tasks[job.id] = asyncio.create_task(run())
+    return job
+
+async def server_max_batch_size() -> int:
+    """Largest batch the Chroma server accepts for add/upsert/delete."""
+    client = await get_chroma_client()
+    try:
+        return int(await chroma_call(client.get_max_batch_size))
+    except Exception as e:
+        logger.warning(f"Could not read max batch size from ChromaDB, using 5000: {e}")
+        return 5000
+
+async def delete_ids(collection_name: str, collection, ids: List[str], batch_size: int) -> int:
+    """Delete `ids` in batches of `batch_size`, keeping caches, the facet index and stats in step."""
+    # Bulk deletes would re-read every document with its embedding just for the stats; let them rescan
+    track_stats = len(ids) <= STATS_DELTA_MAX_DOCUMENTS
+    for start in range(0, len(ids), batch_size):
+        chunk = ids[start:start + batch_size]
+        # Keep the facet index and stats exact: they need to know what is about to go
+        removed = stats_removed = None
+        if track_stats and collection_stats_are_current(collection_name):
+            removed = stats_removed = await chroma_call(collection.get, ids=chunk,
+                                                        include=["documents", "metadatas", "embeddings"])
+        elif facet_index_is_current(collection_name):
+            removed = await chroma_call(collection.get, ids=chunk, include=["metadatas"])
+        await chroma_call(collection.delete, ids=chunk)
+        invalidate_collection_caches(collection_name)
+        update_facet_index(collection_name, removed=removed and (removed.get("metadatas") or [None] * len(removed["ids"])))
+        # Metadata alone would skew the text and embedding totals; without the full rows the stats go stale
+        update_collection_stats(collection_name, removed=stats_removed)
+    return len(ids)
+
+def _import_rows(path: str, fmt: str, on_error):
+    """
+    Yield (row, progress) from an uploaded NDJSON, CSV or Parquet file. Rows use the
+    export layout (id, document, metadata, embedding); unparsable rows and rows that are
+    not objects go to `on_error`.
+    """
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(path)
+        total_rows = parquet_file.metadata.num_rows or 1
+        seen = 0
+        for record_batch in parquet_file.iter_batches():
+            for row in record_batch.to_pylist():
+                seen += 1
+                if isinstance(row.get("metadata"), str):
+                    try:
+                        row["metadata"] = json.loads(row["metadata"]) if row["metadata"] else None
+                    except ValueError as e:
+                        on_error({"line": seen, "error": f"Invalid JSON column: {e}"})
+                        continue
+                yield row, seen / total_rows
+        return
+
+    size = os.path.getsize(path) or 1
+    with open(path, "rb") as f:
+        if fmt == "ndjson":
+            for line_no, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    on_error({"line": line_no, "error": f"Invalid JSON: {e}"})
+                    continue
+                if not isinstance(row, dict):
+                    on_error({"line": line_no, "error": f"Expected a JSON object, got {type(row).__name__}"})
+                    continue
+                yield row, f.tell() / size
+        else:
+            reader = csv.DictReader(line.decode("utf-8") for line in f)
+            while True:
+                try:
+                    record = next(reader)
+                except StopIteration:
+                    break
+                except csv.Error as e:
+                    on_error({"line": reader.line_num, "error": f"Invalid CSV: {e}"})
+                    continue
+                try:
+                    row = {
+                        "id": record.get("id") or None,
+                        "document": record.get("document"),
+                        "metadata": json.loads(record["metadata"]) if record.get("metadata") else None,
+                        "embedding": json.loads(record["embedding"]) if record.get("embedding") else None,
+                    }
+                except ValueError as e:
+                    on_error({"line": reader.line_num, "error": f"Invalid JSON column: {e}"})
+                    continue
+                yield row, f.tell() / size
+
+def _import_batches(path: str, fmt: str, batch_size: int, on_error):
+    """Group imported rows into (index, rows, progress) batches of `batch_size`."""
+    batch: List[Dict[str, Any]] = []
+    index = 0
+    progress = 0.0
+    for row, progress in _import_rows(path, fmt, on_error):
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield index, batch, progress
+            index += 1
+            batch = []
+    if batch:
+        yield index, batch, progress
+
+def _import_params(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Build add/upsert arguments; embeddings are only passed when every row has one."""
+    params: Dict[str, Any] = {
+        "ids": [str(row.get("id") or uuid.uuid4()) for row in rows],
+        "documents": [row.get("document") or "" for row in rows],
+    }
+    metadatas = [row.get("metadata") or None for row in rows]
+    if any(metadatas):
+        params["metadatas"] = metadatas
+    embeddings = [row.get("embedding") for row in rows]
+    if all(embedding is not None for embedding in embeddings):
+        params["embeddings"] = embeddings
+    return params
+
+async def run_import(job: JobStatus, collection_name: str, collection, path: str, fmt: str,
+                     batch_size: int, workers: int, mode: str):
+    """Producer/consumer import: one reader thread parses batches, `workers` coroutines write them."""
+    queue: asyncio.Queue = asyncio.Queue(maxsize=workers * 2)
+    write = getattr(collection, mode)
+    loop = asyncio.get_running_loop()
+
+    def on_parse_error(error: Dict[str, Any]):
+        # Called from the reader thread
+        def apply():
+            record_job_error(job, error)
+            update_job_progress(job, failed=1)
+        loop.call_soon_threadsafe(apply)
+
+    async def produce():
+        batches = _import_batches(path, fmt, batch_size, on_parse_error)
+        try:
+            while True:
+                item = await loop.run_in_executor(None, next, batches, None)
+                if item is None:
+                    break
+                await queue.put(item)
+        finally:
+            for _ in range(workers):
+                await queue.put(None)
+
+    async def consume():
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            index, rows, progress = item
+            try:
+                params = _import_params(rows)
+                await chroma_call(write, timeout=IMPORT_BATCH_TIMEOUT, **params)
+                update_job_progress(job, processed=len(rows), progress=progress)
+            except Exception as e:
+                detail = e.detail if isinstance(e, HTTPException) else str(e)
+                logger.warning(f"Import batch {index} into {collection_name} failed: {detail}")
+                record_job_error(job, {"batch": index, "first_id": rows[0].get("id"), "size": len(rows), "error": detail})
+                update_job_progress(job, failed=len(rows), progress=progress)
+            invalidate_collection_caches(collection_name)
+
+    await asyncio.gather(produce(), *(consume() for _ in range(workers)))
+    job.result = {"batch_size": batch_size, "workers": workers, "mode": mode}
+
+async def run_delete_by_filter(job: JobStatus, collection_name: str, collection, where: Dict[str, Any],
+                              where_document: Optional[Dict[str, Any]], batch_size: int, workers: int):
+    """
+    Delete matching documents round by round: resolve the first batch_size x workers matching ids,
+    delete them as `workers` parallel batches, repeat. Deleted documents drop out of the next
+    round's get(), so no offsets drift; ids that failed to delete are skipped over.
+    """
+    job.total = cached_filtered_count(collection_name, where, where_document)
+    if job.total is None:
+        job.total = await filtered_count_task(collection_name, collection, where, where_document)
+    round_size = batch_size * workers
+    skipped = 0
+
+    async def delete(batch: List[str]) -> int:
+        try:
+            await delete_ids(collection_name, collection, batch, len(batch))
+            update_job_progress(job, processed=len(batch))
+            return 0
+        except Exception as e:
+            detail = e.detail if isinstance(e, HTTPException) else str(e)
+            logger.warning(f"Deleting a batch of {len(batch)} from {collection_name} failed: {detail}")
+            record_job_error(job, {"first_id": batch[0], "size": len(batch), "error": detail})
+            update_job_progress(job, failed=len(batch))
+            return len(batch)
+
+    while True:
+        chunk = await chroma_call(
+            collection.get,
+            **filter_params(where, where_document),
+            limit=round_size,
+            offset=skipped,
+            include=[]
+        )
+        ids = chunk["ids"]
+        if ids:
+            failed = await asyncio.gather(*(delete(ids[i:i + batch_size]) for i in range(0, len(ids), batch_size)))
+            skipped += sum(failed)
+        if len(ids) < round_size:
+            break
+    job.result = {"deleted": job.processed, "batch_size": batch_size, "workers": workers}
+
+# Collection-level metadata keys older clients use for HNSW settings
+HNSW_METADATA_KEYS = {
+    "space": "hnsw:space",
+    "ef_construction": "hnsw:construction_ef",
+    "ef_search": "hnsw:search_ef",
+    "max_neighbors": "hnsw:M",
+    "num_threads": "hnsw:num_threads",
+    "resize_factor": "hnsw:resize_factor",
+    "batch_size": "hnsw:batch_size",
+    "sync_threshold": "hnsw:sync_threshold",
+}
+
+def build_embedding_function(name: str, config: Dict[str, Any]):
+    """Instantiate a registered Chroma embedding function from its name and config."""
+    try:
+        from chromadb.utils.embedding_functions import known_embedding_functions
+    except ImportError:
+        raise HTTPException(status_code=400, detail="Choosing an embedding function requires chromadb >= 1.0")
+    if name not in known_embedding_functions:
+        raise HTTPException(status_code=400, detail=f"Unknown embedding function '{name}'; "
+                                                    f"expected one of {sorted(known_embedding_functions)}")
+    try:
+        return known_embedding_functions[name].build_from_config(config)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Could not build embedding function '{name}': {e}")
+
+def _collection_space(collection) -> Optional[str]:
+    configuration = getattr(collection, "configuration", None)
+    if isinstance(configuration, dict) and configuration.get("hnsw"):
+        return configuration["hnsw"].get("space")
+    return (collection.metadata or {}).get("hnsw:space")
+
+async def create_migration_target(source, migrate: CollectionMigrate, embedding_function):
+    """Create the target collection with the source's metadata and the requested index settings."""
+    client = await get_chroma_client()
+    hnsw = dict(migrate.hnsw)
+    space = migrate.space or _collection_space(source)
+    if space:
+        hnsw["space"] = space
+    metadata = {key: value for key, value in (source.metadata or {}).items() if not key.startswith("hnsw:")}
+    params: Dict[str, Any] = {"name": migrate.target}
+    if "configuration" in inspect.signature(client.create_collection).parameters:
+        if hnsw:
+            params["configuration"] = {"hnsw": hnsw}
+    else:
+        unknown = set(hnsw) - set(HNSW_METADATA_KEYS)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unsupported HNSW settings: {sorted(unknown)}")
+        metadata.update({HNSW_METADATA_KEYS[key]: value for key, value in hnsw.items()})
+    if metadata:
+        params["metadata"] = metadata
+    if embedding_function is not None:
+        params["embedding_function"] = embedding_function
+    return await chroma_call(client.create_collection, **params)
+
+def migration_checkpoint_path(source_name: str, target_name: str) -> str:
+    key = json.dumps(list(collection_scope(source_name)) + [target_name])
+    return os.path.join(MIGRATION_CHECKPOINT_DIR, hashlib.sha256(key.encode()).hexdigest()[:32] + ".json")
+
+async def run_migration(job: JobStatus, source_name: str, source, target, embedding_function,
+                        checkpoint_path: str, checkpoint: Dict[str, Any], batch_size: int, workers: int):
+    """
+    Producer/consumer copy: one reader pages through the source from the checkpoint offset and
+    `workers` coroutines (re-)embed and upsert the batches. The checkpoint only advances past a
+    batch once it and every batch before it are written, so a resumed run may redo a few batches
+    (upserts make that harmless) but never skips one. A failed batch holds the checkpoint at its
+    offset and fails the job, leaving the checkpoint for resume to retry from there.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=workers * 2)
+    include = ["documents", "metadatas"] if embedding_function is not None else ["documents", "metadatas", "embeddings"]
+    start = checkpoint["offset"]
+    job.total = max(await chroma_call(source.count) - start, 0)
+    if start:
+        job.message = f"Resumed at document {start}"
+    # Sizes of batches read but not yet behind the checkpoint, and which of them are done
+    pending: Dict[int, int] = {}
+    finished: Set[int] = set()
+
+    def advance(offset: int):
+        finished.add(offset)
+        # A batch still in flight when the job was cancelled must not move the checkpoint
+        if checkpoint["offset"] not in finished or job.finished_at is not None:
+            return
+        while checkpoint["offset"] in finished:
+            finished.discard(checkpoint["offset"])
+            checkpoint["offset"] += pending.pop(checkpoint["offset"])
+        write_json_file(checkpoint_path, checkpoint)
+
+    async def produce():
+        offset = start
+        try:
+            async for batch in iter_collection_batches(source, None, include, batch_size, offset=offset):
+                pending[offset] = len(batch["ids"])
+                await queue.put((offset, batch))
+                offset += len(batch["ids"])
+        finally:
+            for _ in range(workers):
+                await queue.put(None)
+
+    async def consume():
+        while True:
+            item = await queue.get()
+            if item is None or job.finished_at is not None:
+                return
+            offset, batch = item
+            ids = batch["ids"]
+            params: Dict[str, Any] = {"ids": ids, "documents": batch["documents"], "metadatas": batch["metadatas"]}
+            try:
+                if embedding_function is None:
+                    params["embeddings"] = batch["embeddings"]
+                else:
+                    if any(document is None for document in batch["documents"]):
+                        raise ValueError("documents without text cannot be re-embedded")
+                    params["embeddings"] = await loop.run_in_executor(None, embedding_function, batch["documents"])
+                await chroma_call(target.upsert, **params)
+                update_job_progress(job, processed=len(ids))
+                advance(offset)
+            except Exception as e:
+                detail = e.detail if isinstance(e, HTTPException) else str(e)
+                logger.warning(f"Migrating batch at offset {offset} of {source_name} failed: {detail}")
+                record_job_error(job, {"offset": offset, "first_id": ids[0], "size": len(ids), "error": detail})
+                update_job_progress(job, failed=len(ids))
+            invalidate_collection_caches(target.name)
+
+    await asyncio.gather(produce(), *(consume() for _ in range(workers)))
+    job.result = {
+        "target": target.name,
+        "re_embedded": embedding_function is not None,
+        "resumed_from": start,
+        "copied": job.processed,
+        "batch_size": batch_size,
+        "workers": workers,
+    }
+    if job.failed:
+        job.result["checkpoint_offset"] = checkpoint["offset"]
+        raise RuntimeError(f"{job.failed} documents failed to migrate; resume retries from document {checkpoint['offset']}")
+    try:
+        os.unlink(checkpoint_path)
+    except OSError:
+        pass
+
+def _unit_vectors(batch: Dict[str, Any]) -> np.ndarray:
+    vectors = np.asarray(batch["embeddings"], dtype=np.float32).reshape(len(batch["ids"]), -1)
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+def _block_pairs(a: np.ndarray, b: np.ndarray, min_score: float, same: bool = False, on_tile=None):
+    """
+    Row pairs (i, j) with a[i] . b[j] >= min_score and their scores, computed one DEDUP_BLOCK_SIZE
+    square tile at a time so memory stays bounded. With same=True (b is a) only i < j is reported.
+    With on_tile, each tile's pairs are handed to it as they are found instead of being collected.
+    """
+    step = DEDUP_BLOCK_SIZE
+    rows, cols, scores = [], [], []
+    for i in range(0, len(a), step):
+        for j in range(i if same else 0, len(b), step):
+            tile = a[i:i + step] @ b[j:j + step].T
+            hits = tile >= min_score
+            if same and i == j:
+                hits = np.triu(hits, k=1)
+            r, c = np.nonzero(hits)
+            if on_tile is not None:
+                on_tile(r + i, c + j, tile[r, c])
+                continue
+            rows.append(r + i)
+            cols.append(c + j)
+            scores.append(tile[r, c])
+    if not rows:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+    return np.concatenate(rows), np.concatenate(cols), np.concatenate(scores)
+
+class DuplicateGroups:
+    """
+    Union-find over matched pairs (indexes in scan order), fed as pairs are found so only the
+    connected documents are held rather than every pair. Components chain pairs, so two members
+    may not be similar at all; _keeper_groups() splits them around the documents that are kept.
+    """
+
+    def __init__(self):
+        self.parent: Dict[int, int] = {}
+        self.pairs = 0
+
+    def find(self, x: int) -> int:
+        root = x
+        while self.parent.get(root, root) != root:
+            root = self.parent[root]
+        while x != root:
+            self.parent[x], x = root, self.parent[x]
+        return root
+
+    def add(self, rows: np.ndarray, cols: np.ndarray, scores: np.ndarray):
+        self.pairs += len(rows)
+        if self.pairs > DEDUP_MAX_PAIRS:
+            raise RuntimeError(
+                f"More than {DEDUP_MAX_PAIRS} pairs are above the similarity threshold; "
+                f"use a higher threshold or a narrower filter"
+            )
+        for i, j in zip(rows.tolist(), cols.tolist()):
+            ri, rj = self.find(i), self.find(j)
+            if ri != rj:
+                root, other = min(ri, rj), max(ri, rj)
+                self.parent.setdefault(root, root)
+                self.parent[other] = root
+
+    def components(self) -> List[List[int]]:
+        """Members of each component in scan order, components ordered by their first member."""
+        members: Dict[int, List[int]] = {}
+        for node in self.parent:
+            members.setdefault(self.find(node), []).append(node)
+        return [sorted(nodes) for _, nodes in sorted(members.items())]
+
+class _KeeperGroups:
+    """
+    Leader clustering of one component in scan order: each document joins the earliest kept
+    document it is at least `threshold` similar to, or is kept itself. Entries of `groups` are
+    (kept index, member indexes, member similarities to the kept document).
+    """
+
+    def __init__(self, threshold: float):
+        self.threshold = threshold
+        self.matrix: Optional[np.ndarray] = None
+        self.groups: List[Tuple[int, List[int], List[float]]] = []
+
+    def add(self, node: int, vector: np.ndarray):
+        kept = len(self.groups)
+        if kept:
+            scores = self.matrix[:kept] @ vector
+            hits = np.flatnonzero(scores >= self.threshold)
+            if len(hits):
+                _, members, similarities = self.groups[hits[0]]
+                members.append(node)
+                similarities.append(float(scores[hits[0]]))
+                return
+        if self.matrix is None or kept == len(self.matrix):
+            grown = np.zeros((max(16, 2 * kept), len(vector)), dtype=np.float32)
+            if kept:
+                grown[:kept] = self.matrix
+            self.matrix = grown
+        self.matrix[kept] = vector
+        self.groups.append((node, [], []))
+
+async def _keeper_groups(collection, ids: List[str], components: List[List[int]],
+                         threshold: float) -> List[Dict[str, Any]]:
+    """
+    Split components into groups whose every member is at least `threshold` similar to the
+    document kept, re-reading the members' embeddings by id in DEDUP_BATCH_SIZE batches.
+    Groups are largest first; documents deleted since the scan are skipped.
+    """
+    loop = asyncio.get_running_loop()
+    flat = [(index, node) for index, nodes in enumerate(components) for node in nodes]
+    keepers: Dict[int, _KeeperGroups] = {}
+    groups: List[Dict[str, Any]] = []
+
+    def finish(before: int):
+        for index in sorted(index for index in keepers if index < before):
+            for keep, members, similarities in keepers.pop(index).groups:
+                if members:
+                    groups.append({
+                        "keep": ids[keep],
+                        "duplicates": [ids[node] for node in members],
+                        "similarities": [round(score, 4) for score in similarities],
+                        "min_similarity": round(min(similarities), 4),
+                    })
 
-        # Branch by client version: >=0.5 uses v2 API directly
-        errors: list[str] = []
-        client_version = getattr(chromadb, '__version__', '0')
-        logger.info(f"Detected chromadb client version: {client_version}")
+    for start in range(0, len(flat), DEDUP_BATCH_SIZE):
+        chunk = flat[start:start + DEDUP_BATCH_SIZE]
+        batch = await chroma_call(collection.get, ids=[ids[node] for _, node in chunk], include=["embeddings"])
+        if not batch["ids"]:
+            continue
+        position = {doc_id: row for row, doc_id in enumerate(batch["ids"])}
+        vectors = _unit_vectors(batch)
 
-        def is_modern():
-            try:
-                parts = client_version.split('.')
-                major = int(parts[0]); minor = int(parts[1]) if len(parts)>1 else 0
-                return (major, minor) >= (0,5)
-            except Exception:
-                return False
-
-        def test_client(client: "chromadb.HttpClient"):
-            """Run a series of lightweight probes to assert connectivity."""
-            try:
-                version = client.get_version()
-                logger.info(f"Chroma server version: {version}")
-            except Exception as ve:
-                logger.warning(f"get_version failed: {ve}")
-            try:
-                cols = client.list_collections()
-                logger.info(f"list_collections ok, count={len(cols)}")
-            except Exception as le:
-                logger.warning(f"list_collections failed: {le}")
-            # Heartbeat (some versions still expose)
-            try:
-                client.heartbeat()
-                logger.info("heartbeat ok")
-            except Exception as he:
-                logger.warning(f"heartbeat failed (may be expected on v2): {he}")
+        def assign():
+            for index, node in chunk:
+                row = position.get(ids[node])
+                if row is not None:
+                    keepers.setdefault(index, _KeeperGroups(threshold)).add(node, vectors[row])
 
-        if is_modern():
-            logger.info("Using modern (>=0.5) single v2 connection strategy")
-            try:
-                logger.info("Attempting v2 connection with minimal settings...")
-                chroma_client = chromadb.HttpClient(
-                    host="localhost",
-                    port=8001,
-                    settings=Settings(api_version="v2", chroma_server_host="localhost", chroma_server_http_port=8001, anonymized_telemetry=False)
-                )
-                test_client(chroma_client)
-                logger.info("Connected with modern v2 strategy")
-            except Exception as me:
-                logger.error(f"Modern v2 connection failed: {me}")
-                errors.append(f"modern:{me}")
-                
-                # Try alternative v2 approaches
-                try:
-                    logger.info("Trying v2 with default tenant/database...")
-                    chroma_client = chromadb.HttpClient(
-                        host="localhost",
-                        port=8001,
-                        tenant="default_tenant",
-                        database="default_database"
-                    )
-                    test_client(chroma_client)
-                    logger.info("Connected with v2 + tenant/database")
-                except Exception as me2:
-                    logger.error(f"V2 + tenant/database failed: {me2}")
-                    errors.append(f"v2_tenant:{me2}")
-                    
-                    # Try without explicit settings
-                    try:
-                        logger.info("Trying plain HttpClient for v2 server...")
-                        chroma_client = chromadb.HttpClient(host="localhost", port=8001)
-                        test_client(chroma_client)
-                        logger.info("Connected with plain HttpClient")
-                    except Exception as me3:
-                        logger.error(f"Plain HttpClient failed: {me3}")
-                        errors.append(f"plain:{me3}")
-                        chroma_client = None
-        else:
-            # Legacy multi-strategy fallback
-            logger.info("Using legacy (<0.5) multi-strategy connection attempts")
-            # Strategy 1: Plain default (legacy style)
-            try:
-                logger.info("Strategy 1: plain HttpClient(host, port)")
-                chroma_client = chromadb.HttpClient(host="localhost", port=8001)
-                test_client(chroma_client)
-                logger.info("Connected with Strategy 1")
-            except Exception as e1:
-                errors.append(f"S1:{e1}")
-                logger.warning(f"Strategy 1 failed: {e1}")
-                chroma_client = None
-            # Strategy 2: Explicit v2 API setting (some transitional servers) 
-            if chroma_client is None:
-                try:
-                    logger.info("Strategy 2: HttpClient + Settings(api_version='v2')")
-                    chroma_client = chromadb.HttpClient(
-                        host="localhost", 
-                        port=8001,
-                        settings=Settings(chroma_server_host="localhost", chroma_server_http_port=8001, allow_reset=True, anonymized_telemetry=False, api_version="v2")
-                    )
-                    test_client(chroma_client)
-                    logger.info("Connected with Strategy 2")
-                except Exception as e2:
-                    errors.append(f"S2:{e2}")
-                    logger.warning(f"Strategy 2 failed: {e2}")
-                    chroma_client = None
-            if chroma_client is None:
-                raise RuntimeError("All legacy connection strategies failed: " + " | ".join(errors))
-
-        if chroma_client is None:
-            raise RuntimeError("No successful connection strategy.")
+        await loop.run_in_executor(None, assign)
+        # Components that ended in this batch are complete
+        finish(chunk[-1][0])
+    finish(len(components))
+    groups.sort(key=lambda group: -len(group["duplicates"]))
+    return groups
 
-    except Exception as e:
-        logger.error(f"Failed to connect to ChromaDB: {e}")
-        logger.error(f"Error type: {type(e).__name__}")
-        logger.error("Please ensure ChromaDB is running on localhost:8001 and matches client version.")
-        logger.error("If running newer Chroma (>=0.5 / v2 API), confirm server supports multi-tenancy or disable it.")
-        chroma_client = None
-    yield
-    # Cleanup (if needed)
+async def _exact_duplicate_search(job: JobStatus, collection, where: Dict[str, Any],
+                                  where_document: Optional[Dict[str, Any]], threshold: float, matching: int,
+                                  groups: DuplicateGroups) -> List[str]:
+    """
+    Blocked all-pairs search. Each pass holds the next DEDUP_MEMORY_BYTES of vectors as a block,
+    compares it with itself and streams every later document against it, so collections larger
+    than the budget take several passes. Each tile's pairs go straight into `groups`; returns the
+    ids in scan order.
+    """
+    loop = asyncio.get_running_loop()
+    ids: List[str] = []
+    block_rows = None
 
-app = FastAPI(
-    title="ChromaDB Management API",
-    description="API for managing ChromaDB collections and documents",
-    version="1.0.0",
-    lifespan=lifespan
-)
+    async def compare(a, b, same, a_offset, b_offset):
+        def on_tile(rows, cols, scores):
+            groups.add(rows + a_offset, cols + b_offset, scores)
+        await loop.run_in_executor(None, _block_pairs, a, b, threshold, same, on_tile)
 
-# CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:3000"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+    start = 0
+    while True:
+        parts: List[np.ndarray] = []
+        held = 0
+        block = None
+        position = start
+        async for batch in iter_collection_batches(collection, where, ["embeddings"], DEDUP_BATCH_SIZE,
+                                                   where_document, offset=start):
+            vectors = _unit_vectors(batch)
+            if block_rows is None:
+                block_rows = max(DEDUP_BLOCK_SIZE, DEDUP_MEMORY_BYTES // (vectors.shape[1] * 4))
+                job.total = sum(matching - p * block_rows for p in range(-(-matching // block_rows)))
+            if start == 0:
+                ids.extend(batch["ids"])
+            if block is None:
+                take = min(len(vectors), block_rows - held)
+                parts.append(vectors[:take])
+                held += take
+                if held == block_rows:
+                    block = np.concatenate(parts)
+                    await compare(block, block, True, start, start)
+                vectors = vectors[take:]
+                position += take
+            if block is not None and len(vectors):
+                await compare(block, vectors, False, start, position)
+                position += len(vectors)
+            update_job_progress(job, processed=len(batch["ids"]))
+        if block is None:
+            if parts:
+                block = np.concatenate(parts)
+                await compare(block, block, True, start, start)
+            break
+        if position == start + held:
+            break
+        start += held
+    return ids
 
-# Pydantic models
-class CollectionCreate(BaseModel):
-    name: str
+async def _lsh_duplicate_pairs(job: JobStatus, collection, where: Dict[str, Any],
+                               where_document: Optional[Dict[str, Any]], threshold: float, matching: int, seed: int):
+    """
+    Approximate search for collections too large to compare exhaustively. A single pass keeps only
+    DEDUP_LSH_TABLES x DEDUP_LSH_BITS random-hyperplane sign bits per document. Documents sharing a
+    bucket in any table whose sign bits estimate a similarity within DEDUP_LSH_MARGIN of the
+    threshold are then fetched by id and verified exactly.
+    """
+    loop = asyncio.get_running_loop()
+    n_bits = DEDUP_LSH_TABLES * DEDUP_LSH_BITS
+    weights = (1 << np.arange(DEDUP_LSH_BITS)).astype(np.uint16)
+    ids: List[str] = []
+    signs: List[np.ndarray] = []
+    keys: List[np.ndarray] = []
+    planes = None
+    job.total = matching
 
-class CollectionQuery(BaseModel):
-    query_text: str
-    n_results: int = 5
+    async for batch in iter_collection_batches(collection, where, ["embeddings"], DEDUP_BATCH_SIZE, where_document):
+        vectors = _unit_vectors(batch)
+        if planes is None:
+            planes = np.random.default_rng(seed).standard_normal((vectors.shape[1], n_bits)).astype(np.float32)
+        bits = (vectors @ planes) > 0
+        ids.extend(batch["ids"])
+        signs.append(np.packbits(bits, axis=1))
+        keys.append((bits.reshape(len(bits), DEDUP_LSH_TABLES, DEDUP_LSH_BITS) @ weights).astype(np.uint16, copy=False))
+        update_job_progress(job, processed=len(vectors), progress=0.5 * len(ids) / max(matching, len(ids)))
+    if len(ids) < 2:
+        return ids, []
 
-class DocumentAdd(BaseModel):
-    documents: List[str]
-    metadatas: Optional[List[Dict[str, Any]]] = None
-    ids: Optional[List[str]] = None
+    all_signs = np.concatenate(signs)
+    all_keys = np.concatenate(keys)
+    # The fraction of disagreeing sign bits estimates the angle: cos(pi * hamming / n_bits)
+    floor = max(threshold - DEDUP_LSH_MARGIN, -1.0)
+    min_agreement = n_bits - 2 * n_bits * np.arccos(floor) / np.pi
 
-class DocumentDelete(BaseModel):
-    ids: List[str]
+    def candidates():
+        found = []
+        total = 0
+        for table in range(DEDUP_LSH_TABLES):
+            order = np.argsort(all_keys[:, table], kind="stable")
+            bounds = np.flatnonzero(np.diff(all_keys[order, table])) + 1
+            for members in np.split(order, bounds):
+                if len(members) < 2:
+                    continue
+                members = np.sort(members)
+                plus_minus = np.unpackbits(all_signs[members], axis=1, count=n_bits).astype(np.float32) * 2 - 1
+                rows, cols, _ = _block_pairs(plus_minus, plus_minus, min_agreement, same=True)
+                found.append(members[rows] * len(ids) + members[cols])
+                total += len(rows)
+                if total > DEDUP_MAX_PAIRS:
+                    raise RuntimeError(
+                        f"More than {DEDUP_MAX_PAIRS} candidate pairs are near the similarity threshold; "
+                        f"use a higher threshold or a narrower filter"
+                    )
+        return np.unique(np.concatenate(found)) if found else np.zeros(0, dtype=np.int64)
 
-class HealthResponse(BaseModel):
-    status: str
-    message: Optional[str] = None
+    encoded = await loop.run_in_executor(None, candidates)
+    first, second = encoded // len(ids), encoded % len(ids)
+    involved = np.unique(np.concatenate([first, second]))
+    vectors = np.zeros((len(involved), planes.shape[0]), dtype=np.float32)
+    for start in range(0, len(involved), DEDUP_BATCH_SIZE):
+        chunk_ids = [ids[i] for i in involved[start:start + DEDUP_BATCH_SIZE]]
+        row_of = {doc_id: start + row for row, doc_id in enumerate(chunk_ids)}
+        batch = await chroma_call(collection.get, ids=chunk_ids, include=["embeddings"])
+        if batch["ids"]:
+            vectors[[row_of[doc_id] for doc_id in batch["ids"]]] = _unit_vectors(batch)
+        update_job_progress(job, progress=0.5 + 0.5 * (start + len(chunk_ids)) / len(involved))
 
-class CollectionInfo(BaseModel):
-    name: str
-    count: int
+    a, b = np.searchsorted(involved, first), np.searchsorted(involved, second)
+    scores = np.concatenate([
+        np.einsum("ij,ij->i", vectors[a[i:i + DEDUP_BATCH_SIZE]], vectors[b[i:i + DEDUP_BATCH_SIZE]])
+        for i in range(0, len(a), DEDUP_BATCH_SIZE)
+    ]) if len(a) else np.zeros(0, dtype=np.float32)
+    keep = scores >= threshold
+    return ids, [(first[keep], second[keep], scores[keep])]
 
-class CollectionData(BaseModel):
-    data: List[Dict[str, Any]]
-    total: int
-    page: int
-    limit: int
+async def run_duplicates(job: JobStatus, collection, where: Dict[str, Any],
+                         where_document: Optional[Dict[str, Any]], request: DuplicatesRequest):
+    """Find near-duplicate embeddings by cosine similarity and store the groups on the job."""
+    if where or where_document:
+        matching = await count_matching(collection, where, where_document)
+    else:
+        matching = await chroma_call(collection.count)
+    method = request.method
+    if method == "auto":
+        method = "exact" if matching <= DEDUP_EXACT_MAX_DOCS else "lsh"
+    loop = asyncio.get_running_loop()
+    found = DuplicateGroups()
+    if method == "exact":
+        ids = await _exact_duplicate_search(job, collection, where, where_document, request.threshold, matching, found)
+    else:
+        ids, pairs = await _lsh_duplicate_pairs(job, collection, where, where_document, request.threshold,
+                                                matching, request.seed)
+        for rows, cols, scores in pairs:
+            await loop.run_in_executor(None, found.add, rows, cols, scores)
+    components = await loop.run_in_executor(None, found.components)
+    groups = await _keeper_groups(collection, ids, components, request.threshold)
+    job.result = {
+        "method": method,
+        "threshold": request.threshold,
+        "scanned": len(ids),
+        "pairs": found.pairs,
+        "group_count": len(groups),
+        "duplicate_count": sum(len(group["duplicates"]) for group in groups),
+        "groups": groups[:DEDUP_MAX_GROUPS],
+    }
 
-class QueryResult(BaseModel):
-    id: str
-    document: str
-    metadata: Optional[Dict[str, Any]] = None
-    distance: Optional[float] = None
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
-class FilterCondition(BaseModel):
-    field: str
-    operator: Literal["equals", "contains", "exists", "not_exists", "not_empty"]
-    value: Optional[str] = None
+def publish_event(event: str, data: Any):
+    """Queue an event for every subscriber; a subscriber that fell too far behind is
+    disconnected so its EventSource reconnects and starts from a fresh snapshot."""
+    payload = _sse(event, data)
+    for queue in list(event_subscribers):
+        try:
+            queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            event_subscribers.discard(queue)
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(None)
 
-class FilterRequest(BaseModel):
-    filters: List[FilterCondition]
-    page: int = Query(1, ge=1)
-    limit: int = Query(10, ge=1, le=100)
+async def _compute_event_snapshot() -> Dict[str, Any]:
+    health = await health_check()
+    collections = event_snapshot.get("collections", {})
+    if health.status == "ok":
+        infos = await list_collections(refresh=True)
+        collections = {info.name: info.count for info in infos}
+    return {"health": health.model_dump(), "collections": collections}
 
-def build_chroma_filter(filters: List[FilterCondition]) -> Dict[str, Any]:
+async def _event_broadcast_loop():
     """
-    Convert FilterCondition list to ChromaDB where clause format
+    Recompute health and collection counts once per EVENTS_INTERVAL (or soon after a
+    dashboard write) for all subscribers together, and push only what changed.
     """
-    if not filters:
-        return {}
-    
-    conditions = []
-    
-    for filter_condition in filters:
-        field = filter_condition.field
-        operator = filter_condition.operator
-        value = filter_condition.value
-        
-        if operator == "equals":
-            if value is not None:
-                conditions.append({field: {"$eq": value}})
-        elif operator == "contains":
-            if value is not None:
-                conditions.append({field: {"$contains": value}})
-        elif operator == "exists":
-            conditions.append({field: {"$ne": None}})
-        elif operator == "not_exists":
-            conditions.append({field: {"$eq": None}})
-        elif operator == "not_empty":
-            # Field exists and is not empty string
-            conditions.append({"$and": [
-                {field: {"$ne": None}},
-                {field: {"$ne": ""}}
-            ]})
-    
-    if len(conditions) == 1:
-        return conditions[0]
-    elif len(conditions) > 1:
-        return {"$and": conditions}
-    else:
-        return {}
+    global event_snapshot, event_broadcaster
+    # The loop serves every subscriber, so it always watches the default endpoint
+    chroma_target.set(DEFAULT_TARGET)
+    try:
+        while event_subscribers:
+            started = time.monotonic()
+            try:
+                snapshot = await _compute_event_snapshot()
+            except Exception as e:
+                logger.warning(f"Event snapshot failed: {e}")
+                snapshot = None
+
+            if snapshot is not None:
+                if not event_snapshot:
+                    publish_event("snapshot", snapshot)
+                else:
+                    if snapshot["health"] != event_snapshot["health"]:
+                        publish_event("health", snapshot["health"])
+                    previous = event_snapshot["collections"]
+                    current = snapshot["collections"]
+                    changed = [{"name": name, "count": count} for name, count in current.items() if previous.get(name) != count]
+                    removed = [name for name in previous if name not in current]
+                    if changed or removed:
+                        publish_event("collections", {"changed": changed, "removed": removed})
+                event_snapshot = snapshot
+
+            event_wakeup.clear()
+            try:
+                await asyncio.wait_for(event_wakeup.wait(), timeout=EVENTS_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            # Coalesce bursts of writes (e.g. an import) into one recompute per EVENTS_MIN_INTERVAL
+            remaining = EVENTS_MIN_INTERVAL - (time.monotonic() - started)
+            if remaining > 0:
+                await asyncio.sleep(remaining)
+    finally:
+        event_broadcaster = None
+        event_snapshot = {}
 
 @app.get("/api/health", response_model=HealthResponse)
 async def health_check():
     """Check the connection to ChromaDB"""
-    global chroma_client
-    
-    if chroma_client is None:
-        logger.warning("Health check: ChromaDB client not initialized")
-        return HealthResponse(status="error", message="ChromaDB client not initialized")
+    try:
+        client = await get_chroma_client()
+    except HTTPException as e:
+        logger.warning(f"Health check: {e.detail}")
+        return HealthResponse(status="error", message=e.detail)
     
     try:
         # Test the connection
         logger.info("Health check: Testing ChromaDB connection...")
-        chroma_client.heartbeat()
+        await chroma_call(client.heartbeat, timeout=CHROMA_HEALTH_TIMEOUT)
         logger.info("Health check: ChromaDB connection successful")
         return HealthResponse(status="ok", message="Connected to ChromaDB")
+    except HTTPException as e:
+        logger.error(f"Health check failed: {e.detail}")
+        return HealthResponse(status="error", message=f"Connection failed: {e.detail}")
     except Exception as e:
         logger.error(f"Health check failed: {e}")
         return HealthResponse(status="error", message=f"Connection failed: {str(e)}")
 
+@app.get("/api/endpoints")
+async def list_endpoints():
+    """Configured ChromaDB endpoints with connection, circuit-breaker and server version state"""
+    return client_manager.status()
+
+async def _collection_info(collection, count_semaphore: asyncio.Semaphore) -> CollectionInfo:
+    """Count one entry of list_collections(), reusing the returned handle when possible."""
+    name = getattr(collection, "name", collection)
+    async with count_semaphore:
+        try:
+            # Newer clients return Collection objects; older ones only return names
+            if hasattr(collection, "count"):
+                collection_handle_cache.set(_handle_key(name), collection)
+                count = await chroma_call(collection.count)
+            else:
+                col = await get_collection_handle(name)
+                count = await chroma_call(col.count)
+            return CollectionInfo(name=name, count=count)
+        except Exception as e:
+            logger.warning(f"Could not get count for collection {name}: {e}")
+            return CollectionInfo(name=name, count=0)
+
 @app.get("/api/collections", response_model=List[CollectionInfo])
-async def list_collections():
+async def list_collections(refresh: bool = Query(False, description="Bypass the cached listing")):
     """List all collections with their document counts"""
-    global chroma_client
+    client = await get_chroma_client()
+    target = chroma_target.get()
     
-    if chroma_client is None:
-        raise HTTPException(status_code=500, detail="ChromaDB client not initialized")
+    if not refresh:
+        cached = collections_cache.get(target)
+        if cached is not None:
+            return cached
+    
+    refresh_lock = collections_refresh_locks.get(target)
+    if refresh_lock is None:
+        refresh_lock = collections_refresh_locks[target] = asyncio.Lock()
     
     try:
-        collections = chroma_client.list_collections()
-        result = []
-        
-        for collection in collections:
-            try:
-                # Get the collection to access its count
-                col = chroma_client.get_collection(collection.name)
-                count = col.count()
-                result.append(CollectionInfo(name=collection.name, count=count))
-            except Exception as e:
-                logger.warning(f"Could not get count for collection {collection.name}: {e}")
-                result.append(CollectionInfo(name=collection.name, count=0))
-        
-        return result
+        async with refresh_lock:
+            # Another request may have refreshed the listing while we waited
+            if not refresh:
+                cached = collections_cache.get(target)
+                if cached is not None:
+                    return cached
+            
+            collections = await chroma_call(client.list_collections)
+            count_semaphore = asyncio.Semaphore(COLLECTION_COUNT_CONCURRENCY)
+            result = list(await asyncio.gather(
+                *(_collection_info(collection, count_semaphore) for collection in collections)
+            ))
+            collections_cache.set(target, result)
+            return result
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to list collections: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to list collections: {str(e)}")
@@ -287,14 +3326,15 @@ async def list_collections():
 @app.post("/api/collections")
 async def create_collection(data: CollectionCreate):
     """Create a new collection"""
-    global chroma_client
-    
-    if chroma_client is None:
-        raise HTTPException(status_code=500, detail="ChromaDB client not initialized")
+    client = await get_chroma_client()
     
     try:
-        collection = chroma_client.create_collection(name=data.name)
+        collection = await chroma_call(client.create_collection, name=data.name)
+        invalidate_collection_caches(data.name)
+        collection_handle_cache.set(_handle_key(data.name), collection)
         return {"message": f"Collection '{data.name}' created successfully"}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to create collection {data.name}: {e}")
         if "already exists" in str(e):
@@ -304,17 +3344,23 @@ async def create_collection(data: CollectionCreate):
 @app.delete("/api/collections/{collection_name}")
 async def delete_collection(collection_name: str):
     """Delete a collection"""
-    global chroma_client
-    
-    if chroma_client is None:
-        raise HTTPException(status_code=500, detail="ChromaDB client not initialized")
+    client = await get_chroma_client()
     
     try:
-        chroma_client.delete_collection(name=collection_name)
+        await chroma_call(client.delete_collection, name=collection_name)
+        invalidate_collection_caches(collection_name)
+        forget_collection_handle(collection_name)
+        facet_indexes.pop(collection_scope(collection_name))
+        collection_stats.pop(collection_scope(collection_name))
+        path = stats_path(collection_name)
+        if path is not None and os.path.exists(path):
+            os.unlink(path)
         return {"message": f"Collection '{collection_name}' deleted successfully"}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to delete collection {collection_name}: {e}")
-        if "does not exist" in str(e):
+        if is_missing_collection_error(e, collection_name):
             raise HTTPException(status_code=404, detail=f"Collection '{collection_name}' not found")
         raise HTTPException(status_code=500, detail=f"Failed to delete collection: {str(e)}")
 
@@ -322,162 +3368,334 @@ async def delete_collection(collection_name: str):
 async def get_collection_documents(
     collection_name: str,
     page: int = Query(1, ge=1),
-    limit: int = Query(10, ge=1, le=100)
+    limit: int = Query(10, ge=1, le=100),
+    paging: Literal["page", "cursor"] = Query("page"),
+    cursor: Optional[str] = Query(None),
+    include: Optional[str] = Query(None, description="Comma-separated fields besides ids: documents, metadatas (empty for ids only)"),
+    preview: int = Query(0, ge=0, description="Truncate documents to this many characters"),
+    format: Literal["rows", "columns"] = Query("rows")
 ):
     """Get documents from a collection with pagination"""
-    global chroma_client
-    
-    if chroma_client is None:
-        raise HTTPException(status_code=500, detail="ChromaDB client not initialized")
+    await get_chroma_client()
+    options = listing_options(include, preview, format)
     
     try:
-        collection = chroma_client.get_collection(name=collection_name)
+        collection = await get_collection_handle(collection_name)
+        
+        if paging == "cursor" or cursor:
+            return await cursor_page(collection_name, collection, {}, cursor, limit, options=options)
         
         # Calculate offset
         offset = (page - 1) * limit
         
         # Get total count
-        total_count = collection.count()
+        total_count = await chroma_call(collection.count)
         
         # Get documents with pagination
-        results = collection.get(
+        results = await chroma_call(
+            collection.get,
             limit=limit,
             offset=offset,
-            include=["metadatas", "documents"]
+            include=options.include
         )
         
-        # Format the response
-        documents = []
-        for i in range(len(results["ids"])):
-            documents.append({
-                "id": results["ids"][i],
-                "document": results["documents"][i] if results["documents"] else "",
-                "metadata": results["metadatas"][i] if results["metadatas"] else {}
-            })
-        
-        return CollectionData(
-            data=documents,
-            total=total_count,
-            page=page,
-            limit=limit
-        )
+        return listing_response(results, options, total=total_count, page=page, limit=limit)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to get documents from collection {collection_name}: {e}")
-        if "does not exist" in str(e):
+        if is_missing_collection_error(e, collection_name):
             raise HTTPException(status_code=404, detail=f"Collection '{collection_name}' not found")
         raise HTTPException(status_code=500, detail=f"Failed to get documents: {str(e)}")
 
 @app.post("/api/collections/{collection_name}/filter", response_model=CollectionData)
 async def filter_collection_documents(collection_name: str, filter_request: FilterRequest):
     """Filter documents from a collection based on metadata criteria"""
-    global chroma_client
-    
-    if chroma_client is None:
-        raise HTTPException(status_code=500, detail="ChromaDB client not initialized")
+    await get_chroma_client()
     
     try:
-        collection = chroma_client.get_collection(name=collection_name)
+        collection = await get_collection_handle(collection_name)
         
-        # Build the ChromaDB where clause
-        where_clause = build_chroma_filter(filter_request.filters)
+        # Build the ChromaDB where / where_document clauses
+        where_clause = build_chroma_filter(filter_request.filters, filter_request.match, filter_request.where)
+        where_document = compile_where_document(filter_request.where_document)
+        
+        if filter_request.paging == "cursor" or filter_request.cursor:
+            return await cursor_page(collection_name, collection, where_clause, filter_request.cursor,
+                                     filter_request.limit, where_document, filter_request)
         
         # Calculate offset
         offset = (filter_request.page - 1) * filter_request.limit
         
-        logger.info(f"Filtering collection {collection_name} with where clause: {where_clause}")
+        logger.debug(f"Filtering collection {collection_name} with where clause: {where_clause}, "
+                     f"where_document: {where_document}")
+        
+        total_exact = True
+        has_more = None
         
         # Get filtered documents
-        if where_clause:
-            results = collection.get(
-                where=where_clause,
-                limit=filter_request.limit,
+        if where_clause or where_document:
+            total_count = cached_filtered_count(collection_name, where_clause, where_document)
+            estimate = filter_request.count_mode == "estimate"
+            if total_count is None and not estimate and FILTER_COUNT_EXACT_MAX_DOCS > 0:
+                # Counting a filter over a huge collection takes many full scans; don't hold the page for it
+                estimate = await chroma_call(collection.count) > FILTER_COUNT_EXACT_MAX_DOCS
+            # In estimate mode fetch one extra row to learn whether another page exists
+            results = await chroma_call(
+                collection.get,
+                **filter_params(where_clause, where_document),
+                limit=filter_request.limit + 1 if estimate else filter_request.limit,
                 offset=offset,
-                include=["metadatas", "documents"]
+                include=filter_request.include
             )
+            if estimate:
+                has_more = len(results["ids"]) > filter_request.limit
+                results = head_results(results, filter_request.limit)
             
-            # Get total count for filtered results
-            total_results = collection.get(
-                where=where_clause,
-                include=[]  # Only get count, no actual data
-            )
-            total_count = len(total_results["ids"])
+            # Total for filtered results: reuse a cached count, otherwise count in chunks
+            if total_count is None:
+                count_task = filtered_count_task(collection_name, collection, where_clause, where_document)
+                if estimate:
+                    total_exact = False
+                    total_count = offset + len(results["ids"]) + (1 if has_more else 0)
+                else:
+                    total_count = await asyncio.shield(count_task)
         else:
             # No filters applied, get all documents
-            results = collection.get(
+            results = await chroma_call(
+                collection.get,
                 limit=filter_request.limit,
                 offset=offset,
-                include=["metadatas", "documents"]
+                include=filter_request.include
             )
-            total_count = collection.count()
-        
-        # Format the response
-        documents = []
-        for i in range(len(results["ids"])):
-            documents.append({
-                "id": results["ids"][i],
-                "document": results["documents"][i] if results["documents"] else "",
-                "metadata": results["metadatas"][i] if results["metadatas"] else {}
-            })
+            total_count = await chroma_call(collection.count)
         
-        logger.info(f"Found {len(documents)} documents, total count: {total_count}")
+        logger.debug(f"Found {len(results['ids'])} documents, total count: {total_count}")
         
-        return CollectionData(
-            data=documents,
+        return listing_response(
+            results,
+            filter_request,
             total=total_count,
             page=filter_request.page,
-            limit=filter_request.limit
+            limit=filter_request.limit,
+            total_exact=total_exact,
+            has_more=has_more
         )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to filter documents from collection {collection_name}: {e}")
-        if "does not exist" in str(e):
+        if is_missing_collection_error(e, collection_name):
             raise HTTPException(status_code=404, detail=f"Collection '{collection_name}' not found")
         raise HTTPException(status_code=500, detail=f"Failed to filter documents: {str(e)}")
 
+@app.post("/api/collections/{collection_name}/get")
+async def get_documents_by_id(collection_name: str, data: DocumentGet):
+    """Fetch whole documents by id, e.g. the full text behind a truncated preview"""
+    await get_chroma_client()
+    
+    try:
+        collection = await get_collection_handle(collection_name)
+        results = await chroma_call(collection.get, ids=data.ids, include=data.include)
+        
+        # Return documents in the order they were asked for; unknown ids are left out
+        position = {doc_id: i for i, doc_id in enumerate(results["ids"])}
+        order = [position[doc_id] for doc_id in dict.fromkeys(data.ids) if doc_id in position]
+        for field in ("ids", "documents", "metadatas"):
+            if results.get(field):
+                results[field] = [results[field][i] for i in order]
+        
+        options = ListingOptions(include=data.include, format=data.format)
+        return FastJSONResponse({"data": format_documents(results, options)})
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to get documents from collection {collection_name}: {e}")
+        if is_missing_collection_error(e, collection_name):
+            raise HTTPException(status_code=404, detail=f"Collection '{collection_name}' not found")
+        raise HTTPException(status_code=500, detail=f"Failed to get documents: {str(e)}")
+
 @app.post("/api/collections/{collection_name}/query")
 async def query_collection(collection_name: str, data: CollectionQuery):
     """Query a collection for similar documents"""
-    global chroma_client
-    
-    if chroma_client is None:
-        raise HTTPException(status_code=500, detail="ChromaDB client not initialized")
+    await get_chroma_client()
     
     try:
-        collection = chroma_client.get_collection(name=collection_name)
+        collection = await get_collection_handle(collection_name)
         
         # Perform the query
-        results = collection.query(
+        results, _ = await run_queries(
+            collection_name,
+            collection,
             query_texts=[data.query_text],
-            n_results=data.n_results,
-            include=["metadatas", "documents", "distances"]
+            n_results=data.n_results
         )
-        
-        # Format the response
-        documents = []
-        for i in range(len(results["ids"][0])):
-            documents.append({
-                "id": results["ids"][0][i],
-                "document": results["documents"][0][i] if results["documents"] else "",
-                "metadata": results["metadatas"][0][i] if results["metadatas"] else {},
-                "distance": results["distances"][0][i] if results["distances"] else None
-            })
+        documents = results[0]
         
         return documents
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to query collection {collection_name}: {e}")
-        if "does not exist" in str(e):
+        if is_missing_collection_error(e, collection_name):
+            raise HTTPException(status_code=404, detail=f"Collection '{collection_name}' not found")
+        raise HTTPException(status_code=500, detail=f"Failed to query collection: {str(e)}")
+
+@app.post("/api/collections/{collection_name}/query/batch", response_model=BatchQueryResponse)
+async def batch_query_collection(collection_name: str, data: BatchQuery):
+    """Run many similarity queries (texts or raw embeddings) against a collection at once"""
+    await get_chroma_client()
+    
+    if (data.query_texts is None) == (data.query_embeddings is None):
+        raise HTTPException(status_code=400, detail="Provide exactly one of query_texts or query_embeddings")
+    
+    try:
+        collection = await get_collection_handle(collection_name)
+        
+        results, hits = await run_queries(
+            collection_name,
+            collection,
+            query_texts=data.query_texts,
+            query_embeddings=data.query_embeddings,
+            n_results=data.n_results,
+            where=compile_where(data.where),
+            where_document=compile_where_document(data.where_document)
+        )
+        
+        return BatchQueryResponse(results=results, cache_hits=hits)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to batch query collection {collection_name}: {e}")
+        if is_missing_collection_error(e, collection_name):
             raise HTTPException(status_code=404, detail=f"Collection '{collection_name}' not found")
         raise HTTPException(status_code=500, detail=f"Failed to query collection: {str(e)}")
 
+@app.get("/api/collections/{collection_name}/facets", response_model=FacetsResponse)
+async def get_collection_facets(
+    collection_name: str,
+    keys: Optional[str] = Query(None, description="Comma-separated metadata keys (default: all)"),
+    top_k: int = Query(20, ge=0, le=FACET_MAX_VALUES),
+    wait: bool = Query(False, description="Wait for a running scan to finish")
+):
+    """Metadata keys with their types, distinct values and most common values with counts"""
+    await get_chroma_client()
+    
+    try:
+        scope = collection_scope(collection_name)
+        index = facet_indexes.get(scope)
+        stale = index is not None and index.version != collection_version(collection_name)
+        if index is None or stale or index.status == "failed":
+            collection = await get_collection_handle(collection_name)
+            task = facet_index_task(collection_name, collection)
+            if wait:
+                await asyncio.shield(task)
+            index = facet_indexes.get(scope)
+            stale = index.version != collection_version(collection_name)
+        elif wait and scope in facet_build_tasks:
+            await asyncio.shield(facet_build_tasks[scope])
+        
+        if index.status == "failed" and is_missing_collection_error(Exception(index.error), collection_name):
+            facet_indexes.pop(scope)
+            raise HTTPException(status_code=404, detail=f"Collection '{collection_name}' not found")
+        
+        wanted = [key.strip() for key in keys.split(",") if key.strip()] if keys else sorted(index.fields)
+        return FacetsResponse(
+            collection=collection_name,
+            status=index.status,
+            stale=stale,
+            documents=index.documents,
+            keys_exact=index.keys_exact,
+            fields=[index.facet(key, top_k) for key in wanted if key in index.fields],
+            message=index.error
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to get facets for collection {collection_name}: {e}")
+        if is_missing_collection_error(e, collection_name):
+            raise HTTPException(status_code=404, detail=f"Collection '{collection_name}' not found")
+        raise HTTPException(status_code=500, detail=f"Failed to get facets: {str(e)}")
+
+@app.get("/api/collections/{collection_name}/stats", response_model=CollectionStatsResponse)
+async def get_collection_stats(
+    collection_name: str,
+    refresh: bool = Query(False, description="Rescan even if the stats are current"),
+    wait: bool = Query(False, description="Wait for a running scan to finish")
+):
+    """Document lengths, text size, metadata key coverage and embedding dimensions/norms"""
+    await get_chroma_client()
+    
+    try:
+        scope = collection_scope(collection_name)
+        stats = collection_stats.get(scope)
+        collection = None
+        if stats is None and scope not in stats_scan_tasks:
+            collection = await get_collection_handle(collection_name)
+            stats = await load_collection_stats(collection_name, collection)
+            if stats is not None:
+                collection_stats.set(scope, stats)
+        stale = stats is not None and stats.version != collection_version(collection_name)
+        if stats is None or stale or refresh or stats.status == "failed":
+            collection = collection or await get_collection_handle(collection_name)
+            task = collection_stats_task(collection_name, collection)
+            if wait:
+                await asyncio.shield(task)
+            stats = collection_stats.get(scope)
+            stale = stats.version != collection_version(collection_name)
+        elif wait and scope in stats_scan_tasks:
+            await asyncio.shield(stats_scan_tasks[scope])
+        
+        if stats.status == "failed" and is_missing_collection_error(Exception(stats.error), collection_name):
+            collection_stats.pop(scope)
+            raise HTTPException(status_code=404, detail=f"Collection '{collection_name}' not found")
+        
+        return stats.response(collection_name, stale)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to get stats for collection {collection_name}: {e}")
+        if is_missing_collection_error(e, collection_name):
+            raise HTTPException(status_code=404, detail=f"Collection '{collection_name}' not found")
+        raise HTTPException(status_code=500, detail=f"Failed to get stats: {str(e)}")
+
+@app.post("/api/collections/{collection_name}/projection")
+async def project_collection_embeddings(collection_name: str, data: ProjectionRequest):
+    """2D projection (PCA or random) of a collection's embeddings, as compact float32 binary by default"""
+    await get_chroma_client()
+    
+    try:
+        where_clause = build_chroma_filter(data.filters, where=data.where)
+        where_document = compile_where_document(data.where_document)
+        collection = await get_collection_handle(collection_name)
+        
+        result = await get_projection(collection_name, collection, data, where_clause, where_document)
+        
+        if data.format == "json":
+            return FastJSONResponse({
+                "count": len(result["ids"]),
+                "method": result["method"],
+                "matching": result["matching"],
+                "explained_variance": result["explained_variance"],
+                "ids": result["ids"],
+                "coords": result["coords"].tolist(),
+            })
+        return Response(projection_body(result), media_type="application/octet-stream")
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to project embeddings of collection {collection_name}: {e}")
+        if is_missing_collection_error(e, collection_name):
+            raise HTTPException(status_code=404, detail=f"Collection '{collection_name}' not found")
+        raise HTTPException(status_code=500, detail=f"Failed to project embeddings: {str(e)}")
+
 @app.post("/api/collections/{collection_name}/add")
 async def add_documents(collection_name: str, data: DocumentAdd):
     """Add documents to a collection"""
-    global chroma_client
-    
-    if chroma_client is None:
-        raise HTTPException(status_code=500, detail="ChromaDB client not initialized")
+    await get_chroma_client()
     
     try:
-        collection = chroma_client.get_collection(name=collection_name)
+        collection = await get_collection_handle(collection_name)
         
         # Add documents
         add_params = {
@@ -490,36 +3708,424 @@ async def add_documents(collection_name: str, data: DocumentAdd):
         if data.ids:
             add_params["ids"] = data.ids
         
-        collection.add(**add_params)
+        await chroma_call(collection.add, **add_params)
+        # The stats also count embeddings, which only the server knows
+        added = None
+        if data.ids and len(data.ids) <= STATS_DELTA_MAX_DOCUMENTS and collection_stats_are_current(collection_name):
+            added = await chroma_call(collection.get, ids=data.ids, include=["documents", "metadatas", "embeddings"])
+        invalidate_collection_caches(collection_name)
+        update_facet_index(collection_name, added=data.metadatas or [None] * len(data.documents))
+        update_collection_stats(collection_name, added=added)
         
         return {"message": f"Added {len(data.documents)} documents to collection '{collection_name}'"}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to add documents to collection {collection_name}: {e}")
-        if "does not exist" in str(e):
+        if is_missing_collection_error(e, collection_name):
             raise HTTPException(status_code=404, detail=f"Collection '{collection_name}' not found")
         raise HTTPException(status_code=500, detail=f"Failed to add documents: {str(e)}")
 
 @app.post("/api/collections/{collection_name}/delete")
 async def delete_documents(collection_name: str, data: DocumentDelete):
     """Delete documents from a collection"""
-    global chroma_client
-    
-    if chroma_client is None:
-        raise HTTPException(status_code=500, detail="ChromaDB client not initialized")
+    await get_chroma_client()
     
     try:
-        collection = chroma_client.get_collection(name=collection_name)
+        collection = await get_collection_handle(collection_name)
         
         # Delete documents
-        collection.delete(ids=data.ids)
+        await delete_ids(collection_name, collection, data.ids, len(data.ids) or 1)
         
         return {"message": f"Deleted {len(data.ids)} documents from collection '{collection_name}'"}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to delete documents from collection {collection_name}: {e}")
-        if "does not exist" in str(e):
+        if is_missing_collection_error(e, collection_name):
             raise HTTPException(status_code=404, detail=f"Collection '{collection_name}' not found")
         raise HTTPException(status_code=500, detail=f"Failed to delete documents: {str(e)}")
 
+@app.post("/api/collections/{collection_name}/delete/filter", status_code=202)
+async def delete_documents_by_filter(collection_name: str, data: DeleteByFilter, response: Response):
+    """Delete every document matching a filter as a background job, or count them with dry_run"""
+    await get_chroma_client()
+    
+    where_clause = build_chroma_filter(data.filters, data.match, data.where)
+    where_document = compile_where_document(data.where_document)
+    if not where_clause and not where_document:
+        raise HTTPException(status_code=400, detail="Refusing to delete by an empty filter; delete the collection instead")
+    
+    try:
+        collection = await get_collection_handle(collection_name)
+        
+        if data.dry_run:
+            matching = cached_filtered_count(collection_name, where_clause, where_document)
+            if matching is None:
+                matching = await filtered_count_task(collection_name, collection, where_clause, where_document)
+            sample = await chroma_call(
+                collection.get, **filter_params(where_clause, where_document), limit=10, include=[]
+            )
+            response.status_code = 200
+            return {"dry_run": True, "matching": matching, "sample_ids": sample["ids"]}
+        
+        max_batch = await server_max_batch_size()
+        batch_size = min(data.batch_size, max_batch) if data.batch_size else max_batch
+        job = start_job(
+            "delete",
+            collection_name,
+            lambda job: run_delete_by_filter(job, collection_name, collection, where_clause, where_document,
+                                             batch_size, data.workers)
+        )
+        logger.info(f"Started delete job {job.id} on {collection_name}: where={where_clause}, "
+                    f"where_document={where_document}, batch_size={batch_size}, workers={data.workers}")
+        return job
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to delete documents by filter from collection {collection_name}: {e}")
+        if is_missing_collection_error(e, collection_name):
+            raise HTTPException(status_code=404, detail=f"Collection '{collection_name}' not found")
+        raise HTTPException(status_code=500, detail=f"Failed to delete documents by filter: {str(e)}")
+
+@app.post("/api/collections/{collection_name}/migrate", response_model=JobStatus, status_code=202)
+async def migrate_collection(collection_name: str, data: CollectionMigrate):
+    """Copy a collection into a new one, optionally re-embedding it or changing its index settings"""
+    await get_chroma_client()
+    
+    if data.target == collection_name:
+        raise HTTPException(status_code=400, detail="The target collection must differ from the source")
+    checkpoint_path = migration_checkpoint_path(collection_name, data.target)
+    checkpoint = read_json_file(checkpoint_path)
+    if data.resume and checkpoint is None:
+        raise HTTPException(status_code=404, detail=f"No interrupted migration from '{collection_name}' to '{data.target}'")
+    if migration_jobs.get(checkpoint_path) in job_tasks:
+        raise HTTPException(status_code=409, detail=f"A migration from '{collection_name}' to '{data.target}' is already running")
+    
+    try:
+        source = await get_collection_handle(collection_name)
+        if data.resume:
+            # The checkpoint's options win so a resumed run writes exactly what the first one did
+            options = CollectionMigrate(**checkpoint["options"], target=data.target)
+            embedding_function = (build_embedding_function(options.embedding_function, options.embedding_config)
+                                  if options.embedding_function else None)
+            target = await get_collection_handle(data.target)
+        else:
+            embedding_function = (build_embedding_function(data.embedding_function, data.embedding_config)
+                                  if data.embedding_function else None)
+            try:
+                target = await create_migration_target(source, data, embedding_function or getattr(source, "_embedding_function", None))
+            except HTTPException:
+                raise
+            except Exception as e:
+                if "already exists" in str(e):
+                    raise HTTPException(status_code=409, detail=f"Collection '{data.target}' already exists; "
+                                                                f"pass resume=true to continue an interrupted migration")
+                raise
+            invalidate_collection_caches(data.target)
+            collection_handle_cache.set(_handle_key(data.target), target)
+            checkpoint = {
+                "source": collection_name,
+                "target": data.target,
+                "offset": 0,
+                "options": data.model_dump(exclude={"target", "resume", "batch_size", "workers"}),
+            }
+            await asyncio.get_running_loop().run_in_executor(None, write_json_file, checkpoint_path, checkpoint)
+        
+        job = start_job(
+            "migrate",
+            collection_name,
+            lambda job: run_migration(job, collection_name, source, target, embedding_function,
+                                      checkpoint_path, checkpoint, data.batch_size, data.workers),
+            cleanup=lambda: migration_jobs.pop(checkpoint_path, None)
+        )
+        migration_jobs[checkpoint_path] = job.id
+        logger.info(f"Started migrate job {job.id} from {collection_name} to {data.target} at offset {checkpoint['offset']}: "
+                    f"embedding_function={data.embedding_function}, batch_size={data.batch_size}, workers={data.workers}")
+        return job
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to start migration of collection {collection_name}: {e}")
+        if is_missing_collection_error(e, collection_name):
+            raise HTTPException(status_code=404, detail=f"Collection '{collection_name}' not found")
+        if is_missing_collection_error(e, data.target):
+            raise HTTPException(status_code=404, detail=f"Collection '{data.target}' not found")
+        raise HTTPException(status_code=500, detail=f"Failed to start migration: {str(e)}")
+
+@app.post("/api/collections/{collection_name}/duplicates", response_model=JobStatus, status_code=202)
+async def find_duplicates(collection_name: str, data: DuplicatesRequest):
+    """Find near-duplicate documents by embedding cosine similarity as a background job"""
+    await get_chroma_client()
+    
+    try:
+        where_clause = build_chroma_filter(data.filters, where=data.where)
+        where_document = compile_where_document(data.where_document)
+        collection = await get_collection_handle(collection_name)
+        
+        job = start_job(
+            "duplicates",
+            collection_name,
+            lambda job: run_duplicates(job, collection, where_clause, where_document, data)
+        )
+        logger.info(f"Started duplicates job {job.id} on {collection_name}: threshold={data.threshold}, method={data.method}")
+        return job
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to start duplicate detection on collection {collection_name}: {e}")
+        if is_missing_collection_error(e, collection_name):
+            raise HTTPException(status_code=404, detail=f"Collection '{collection_name}' not found")
+        raise HTTPException(status_code=500, detail=f"Failed to start duplicate detection: {str(e)}")
+
+@app.post("/api/collections/{collection_name}/duplicates/delete")
+async def delete_duplicates(collection_name: str, data: DuplicatesDelete):
+    """Delete the duplicates found by a completed duplicates job, keeping the first document of each group"""
+    await get_chroma_client()
+    
+    job = jobs.get(data.job_id)
+    if job is None or job.kind != "duplicates" or job.collection != collection_name:
+        raise HTTPException(status_code=404, detail=f"Duplicates job '{data.job_id}' not found for collection '{collection_name}'")
+    if job.status != "completed":
+        raise HTTPException(status_code=409, detail=f"Duplicates job '{data.job_id}' is {job.status}")
+    groups = job.result["groups"]
+    selected = list(range(len(groups))) if data.groups is None else list(dict.fromkeys(data.groups))
+    invalid = [index for index in selected if not 0 <= index < len(groups)]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Unknown duplicate groups: {invalid}")
+    ids = [doc_id for index in selected for doc_id in groups[index]["duplicates"]]
+    
+    try:
+        collection = await get_collection_handle(collection_name)
+        deleted = await delete_ids(collection_name, collection, ids, await server_max_batch_size())
+        logger.info(f"Deleted {deleted} duplicates from {collection_name} found by job {job.id}")
+        return {"message": f"Deleted {deleted} duplicate documents from collection '{collection_name}'", "deleted": deleted}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to delete duplicates from collection {collection_name}: {e}")
+        if is_missing_collection_error(e, collection_name):
+            raise HTTPException(status_code=404, detail=f"Collection '{collection_name}' not found")
+        raise HTTPException(status_code=500, detail=f"Failed to delete duplicates: {str(e)}")
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+@app.post("/api/collections/{collection_name}/export")
+async def export_collection(collection_name: str, export: ExportRequest):
+    """Stream a whole (optionally filtered) collection as NDJSON, CSV or Parquet"""
+    await get_chroma_client()
+    
+    if export.format == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(status_code=400, detail="Parquet export requires the 'pyarrow' package")
+    
+    try:
+        collection = await get_collection_handle(collection_name)
+        where_clause = build_chroma_filter(export.filters, where=export.where)
+        where_document = compile_where_document(export.where_document)
+        
+        return StreamingResponse(
+            export_stream(collection_name, collection, where_clause, export, where_document),
+            media_type=EXPORT_MEDIA_TYPES[export.format],
+            headers={"Content-Disposition": f'attachment; filename="{collection_name}.{export.format}"'}
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to export collection {collection_name}: {e}")
+        if is_missing_collection_error(e, collection_name):
+            raise HTTPException(status_code=404, detail=f"Collection '{collection_name}' not found")
+        raise HTTPException(status_code=500, detail=f"Failed to export collection: {str(e)}")
+
+@app.get("/api/collections/{collection_name}/export")
+async def export_collection_download(
+    collection_name: str,
+    format: Literal["ndjson", "csv", "parquet"] = Query("ndjson"),
+    include_embeddings: bool = Query(False)
+):
+    """Download a whole collection (GET variant for plain links, without filters)"""
+    return await export_collection(
+        collection_name,
+        ExportRequest(format=format, include_embeddings=include_embeddings)
+    )
+
+IMPORT_FORMATS = {".ndjson": "ndjson", ".jsonl": "ndjson", ".json": "ndjson", ".csv": "csv", ".parquet": "parquet"}
+
+@app.post("/api/collections/{collection_name}/import", response_model=JobStatus, status_code=202)
+async def import_documents(
+    collection_name: str,
+    file: UploadFile = File(...),
+    format: Optional[Literal["ndjson", "csv", "parquet"]] = Form(None),
+    batch_size: int = Form(IMPORT_BATCH_SIZE, ge=0),
+    workers: int = Form(IMPORT_WORKERS, ge=1, le=32),
+    mode: Literal["add", "upsert"] = Form("upsert")
+):
+    """Bulk import an NDJSON, CSV or Parquet file as a background job"""
+    await get_chroma_client()
+    
+    fmt = format or IMPORT_FORMATS.get(os.path.splitext(file.filename or "")[1].lower())
+    if fmt is None:
+        raise HTTPException(status_code=400, detail="Could not infer the file format; pass format=ndjson|csv|parquet")
+    if fmt == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(status_code=400, detail="Parquet import requires the 'pyarrow' package")
+    
+    try:
+        collection = await get_collection_handle(collection_name)
+        
+        # Keep our own copy: the upload is closed once this request finishes
+        upload = tempfile.NamedTemporaryFile(prefix="chroma-import-", suffix=f".{fmt}", delete=False)
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(None, shutil.copyfileobj, file.file, upload, 1024 * 1024)
+        finally:
+            upload.close()
+        
+        max_batch = await server_max_batch_size()
+        batch_size = min(batch_size, max_batch) if batch_size else max_batch
+        
+        def cleanup():
+            try:
+                os.unlink(upload.name)
+            except OSError:
+                pass
+        
+        job = start_job(
+            "import",
+            collection_name,
+            lambda job: run_import(job, collection_name, collection, upload.name, fmt, batch_size, workers, mode),
+            cleanup=cleanup
+        )
+        logger.info(f"Started import job {job.id} into {collection_name}: format={fmt}, batch_size={batch_size}, workers={workers}")
+        return job
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to start import into collection {collection_name}: {e}")
+        if is_missing_collection_error(e, collection_name):
+            raise HTTPException(status_code=404, detail=f"Collection '{collection_name}' not found")
+        raise HTTPException(status_code=500, detail=f"Failed to start import: {str(e)}")
+
+@app.get("/api/jobs", response_model=List[JobStatus])
+async def list_jobs(collection: Optional[str] = Query(None)):
+    """List background jobs, newest first"""
+    return [job for job in reversed(jobs.values()) if collection is None or job.collection == collection]
+
+@app.get("/api/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str):
+    """Get the status and progress of a background job"""
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    return job
+
+@app.post("/api/jobs/{job_id}/cancel", response_model=JobStatus)
+async def cancel_job(job_id: str):
+    """Cancel a running background job"""
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    task = job_tasks.get(job_id)
+    if task is not None and not task.done():
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    return job
+
+def _cache_metrics() -> str:
+    """Expose the cache hit/miss counters from /api/cache/stats in Prometheus format."""
+    caches = {
+        "collections": collections_cache,
+        "collection_handles": collection_handle_cache,
+        "filter_counts": filter_count_cache,
+        "pages": page_cache,
+        "query_results": query_result_cache,
+        "facet_indexes": facet_indexes,
+        "collection_stats": collection_stats,
+        "projections": projection_cache,
+    }
+    if isinstance(embedding_cache, TieredEmbeddingCache):
+        caches["embeddings_memory"] = embedding_cache.memory
+        if embedding_cache.disk is not None:
+            caches["embeddings_disk"] = embedding_cache.disk
+    lines = [
+        "# HELP dashboard_cache_hits_total Cache hits by cache",
+        "# TYPE dashboard_cache_hits_total counter",
+    ]
+    lines += [f'dashboard_cache_hits_total{{cache="{name}"}} {cache.hits}' for name, cache in caches.items()]
+    lines += [
+        "# HELP dashboard_cache_misses_total Cache misses by cache",
+        "# TYPE dashboard_cache_misses_total counter",
+    ]
+    lines += [f'dashboard_cache_misses_total{{cache="{name}"}} {cache.misses}' for name, cache in caches.items()]
+    return "\n".join(lines)
+
+@app.get("/api/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text exposition of request, ChromaDB call and cache metrics"""
+    body = "\n".join([metric.render() for metric in METRICS] + [_cache_metrics()]) + "\n"
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/api/events")
+async def events():
+    """Server-sent events carrying health and collection count changes"""
+    global event_broadcaster, event_wakeup
+    
+    if event_wakeup is None:
+        event_wakeup = asyncio.Event()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=100)
+    event_subscribers.add(queue)
+    if event_broadcaster is None:
+        event_broadcaster = asyncio.create_task(_event_broadcast_loop())
+    
+    async def stream():
+        try:
+            yield "retry: 5000\n\n"
+            if event_snapshot:
+                yield _sse("snapshot", event_snapshot)
+            while True:
+                try:
+                    payload = await asyncio.wait_for(queue.get(), timeout=EVENTS_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if payload is None:
+                    return
+                yield payload
+        finally:
+            event_subscribers.discard(queue)
+    
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/api/cache/stats")
+async def cache_stats():
+    """Hit/miss counters for the backend's in-memory caches"""
+    return {
+        "collections": collections_cache.stats(),
+        "collection_handles": collection_handle_cache.stats(),
+        "filter_counts": filter_count_cache.stats(),
+        "pages": page_cache.stats(),
+        "query_results": query_result_cache.stats(),
+        "facet_indexes": facet_indexes.stats(),
+        "collection_stats": collection_stats.stats(),
+        "projections": projection_cache.stats(),
+        "embeddings": embedding_cache.stats() if embedding_cache is not None else None,
+    }
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8080)
@@ -49,10 +49,44 @@ export default function Sidebar() {
 
   useEffect(() => {
     fetchData()
-    // Poll every 30 seconds for health status
-    const interval = setInterval(() => {
-      fetchHealthStatus()
-    }, 30000)
+    // Health and collection counts are pushed by the backend instead of polled
+    const events = new EventSource('/api/events')
+    
+    events.addEventListener('snapshot', (event) => {
+      const snapshot = JSON.parse((event as MessageEvent).data)
+      setHealthStatus(snapshot.health)
+      setCollections(
+        Object.entries(snapshot.collections as Record<string, number>).map(([name, count]) => ({ name, count }))
+      )
+    })
+    
+    events.addEventListener('health', (event) => {
+      setHealthStatus(JSON.parse((event as MessageEvent).data))
+    })
+    
+    events.addEventListener('collections', (event) => {
+      const { changed, removed } = JSON.parse((event as MessageEvent).data) as {
+        changed: Collection[]
+        removed: string[]
+      }
+      setCollections((current) => {
+        const next = current.filter((collection) => !removed.includes(collection.name))
+        for (const update of changed) {
+          const index = next.findIndex((collection) => collection.name === update.name)
+          if (index >= 0) {
+            next[index] = update
+          } else {
+            next.push(update)
+          }
+        }
+        return next
+      })
+    })
+    
+    events.onerror = () => {
+      // EventSource reconnects on its own and receives a fresh snapshot
+      setHealthStatus({ status: 'error', message: 'Connection lost, reconnecting...' })
+    }
     
     // 监听集合列表刷新事件
     const unsubscribe = onCollectionsRefresh(() => {
@@ -60,7 +94,7 @@ export default function Sidebar() {
     })
     
     return () => {
-      clearInterval(interval)
+      events.close()
       unsubscribe()
     }
   }, [onCollectionsRefresh])
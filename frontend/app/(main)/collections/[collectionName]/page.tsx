@@ -18,6 +18,8 @@ import {
 import { Card, CardContent, CardHeader, CardTitle } from '@/components/ui/card'
 import { CollectionDataTable } from '@/components/collection-data-table'
 import { MetadataFilter, FilterCondition } from '@/components/MetadataFilter'
+import { EmbeddingProjection } from '@/components/embedding-projection'
+import { CollectionStats } from '@/components/collection-stats'
 import { useDataRefresh } from '@/contexts/data-refresh-context'
 import { Plus, Trash2, ChevronLeft, ChevronRight } from 'lucide-react'
 import { toast } from 'sonner'
@@ -26,6 +28,7 @@ interface Document {
   id: string
   document: string
   metadata?: Record<string, any>
+  truncated?: boolean
 }
 
 interface CollectionData {
@@ -66,6 +69,8 @@ export default function CollectionPage() {
   const [isFilterLoading, setIsFilterLoading] = useState(false)
 
   const limit = 10
+  // Characters of each document shown in the table; the detail view loads the rest
+  const previewLength = 500
 
   useEffect(() => {
     if (isFilterActive) {
@@ -79,7 +84,7 @@ export default function CollectionPage() {
     setIsLoading(true)
     try {
       const response = await fetch(
-        `/api/collections/${encodeURIComponent(collectionName)}?page=${currentPage}&limit=${limit}`
+        `/api/collections/${encodeURIComponent(collectionName)}?page=${currentPage}&limit=${limit}&preview=${previewLength}`
       )
       if (response.ok) {
         const result: CollectionData = await response.json()
@@ -120,7 +125,8 @@ export default function CollectionPage() {
           body: JSON.stringify({
             filters: filters,
             page: 1,
-            limit: limit
+            limit: limit,
+            preview: previewLength
           }),
         }
       )
@@ -167,7 +173,8 @@ export default function CollectionPage() {
           body: JSON.stringify({
             filters: filters,
             page: page,
-            limit: limit
+            limit: limit,
+            preview: previewLength
           }),
         }
       )
@@ -502,6 +509,7 @@ export default function CollectionPage() {
         {/* Metadata Filter */}
         <div className="mt-4">
           <MetadataFilter
+            collectionName={collectionName}
             filters={filters}
             onFiltersChange={setFilters}
             onApplyFilters={applyFilters}
@@ -509,6 +517,16 @@ export default function CollectionPage() {
             isLoading={isFilterLoading}
           />
         </div>
+
+        {/* Embedding Map */}
+        <div className="mt-4">
+          <EmbeddingProjection collectionName={collectionName} />
+        </div>
+
+        {/* Collection Stats */}
+        <div className="mt-4">
+          <CollectionStats collectionName={collectionName} />
+        </div>
         
       </div>
 
@@ -45,41 +45,46 @@ async function proxyRequest(
       url.searchParams.append(key, value)
     })
 
-    const headers: HeadersInit = {
-      'Content-Type': 'application/json',
-    }
-
-    let body: string | undefined
+    const headers: Record<string, string> = {}
 
-    if (method !== 'GET' && method !== 'DELETE') {
-      try {
-        const requestBody = await request.text()
-        if (requestBody) {
-          body = requestBody
-        }
-      } catch (error) {
-        console.error('Failed to read request body:', error)
+    // Forward the body's content type (JSON, multipart uploads, ...) and the ChromaDB
+    // endpoint/tenant/database selection
+    for (const name of ['content-type', 'accept', 'x-chroma-endpoint', 'x-chroma-tenant', 'x-chroma-database']) {
+      const value = request.headers.get(name)
+      if (value) {
+        headers[name] = value
       }
     }
 
+    const hasBody = method !== 'GET' && method !== 'DELETE'
+    if (hasBody && !headers['content-type']) {
+      headers['content-type'] = 'application/json'
+    }
+
+    // Stream the body through unchanged so uploads are neither decoded nor buffered
     const response = await fetch(url.toString(), {
       method,
       headers,
-      body,
-    })
-
-    const responseText = await response.text()
-    let responseData
+      body: hasBody ? request.body : undefined,
+      // Node's fetch only sends a streamed body in half-duplex mode
+      duplex: 'half',
+    } as RequestInit & { duplex: 'half' })
 
-    try {
-      responseData = JSON.parse(responseText)
-    } catch {
-      responseData = responseText
+    // Pass the response through as-is: JSON, NDJSON/CSV/Parquet exports, event streams,
+    // binary projections and /metrics text all keep their content type and stream unbuffered.
+    // fetch has already decompressed the body, so the encoding and length no longer apply.
+    const responseHeaders = new Headers(response.headers)
+    for (const name of ['content-encoding', 'content-length', 'transfer-encoding', 'connection']) {
+      responseHeaders.delete(name)
+    }
+    if (responseHeaders.get('content-type')?.startsWith('text/event-stream')) {
+      responseHeaders.set('Cache-Control', 'no-cache')
     }
 
-    return NextResponse.json(responseData, {
+    return new Response(response.body, {
       status: response.status,
       statusText: response.statusText,
+      headers: responseHeaders,
     })
   } catch (error) {
     console.error('Proxy error:', error)
@@ -1,6 +1,6 @@
 "use client";
 
-import React, { useState } from 'react';
+import React, { useEffect, useState } from 'react';
 import { Button } from '@/components/ui/button';
 import { Input } from '@/components/ui/input';
 import { Label } from '@/components/ui/label';
@@ -9,15 +9,39 @@ import { Card, CardContent, CardHeader, CardTitle } from '@/components/ui/card';
 import { Badge } from '@/components/ui/badge';
 import { X, Plus, Filter } from 'lucide-react';
 
-export type FilterOperator = "equals" | "contains" | "exists" | "not_exists" | "not_empty";
+export type FilterOperator =
+  | "equals" | "not_equals" | "contains" | "exists" | "not_exists" | "not_empty"
+  | "gt" | "gte" | "lt" | "lte" | "in" | "not_in";
+
+export type FilterValueType = "string" | "number" | "bool";
 
 export interface FilterCondition {
   field: string;
   operator: FilterOperator;
   value?: string;
+  // How the backend converts the typed-in value before matching metadata
+  value_type?: FilterValueType;
+}
+
+interface FacetValue {
+  value: string | number | boolean;
+  type: string;
+  count: number;
+}
+
+interface FacetField {
+  key: string;
+  count: number;
+  distinct: number;
+  distinct_exact: boolean;
+  // Number of documents per value type (string, int, float, bool)
+  types: Record<string, number>;
+  top: FacetValue[];
 }
 
 interface MetadataFilterProps {
+  // When set, metadata keys and common values are suggested from the collection's facet index
+  collectionName?: string;
   filters: FilterCondition[];
   onFiltersChange: (filters: FilterCondition[]) => void;
   onApplyFilters: () => void;
@@ -27,25 +51,69 @@ interface MetadataFilterProps {
 
 const operatorLabels: Record<FilterOperator, string> = {
   equals: "Equals",
+  not_equals: "Not Equals",
   contains: "Contains",
   exists: "Exists",
   not_exists: "Not Exists", 
-  not_empty: "Not Empty"
+  not_empty: "Not Empty",
+  gt: ">",
+  gte: "≥",
+  lt: "<",
+  lte: "≤",
+  in: "In",
+  not_in: "Not In"
 };
 
 const operatorDescriptions: Record<FilterOperator, string> = {
   equals: "",
+  not_equals: "",
   contains: "",
   exists: "",
   not_exists: "",
-  not_empty: ""
+  not_empty: "",
+  gt: "Number",
+  gte: "Number",
+  lt: "Number",
+  lte: "Number",
+  in: "Comma-separated",
+  not_in: "Comma-separated"
 };
 
+const valueTypeLabels: Record<FilterValueType, string> = {
+  string: "Text",
+  number: "Number",
+  bool: "Bool"
+};
+
+// Range operators always compare numbers and "contains" always text, so only the others need a type
+const needsValueType = (operator: FilterOperator): boolean => {
+  return ["equals", "not_equals", "in", "not_in"].includes(operator);
+};
+
+// Filter value type for a facet value type; int and float are both numbers to the backend
+const facetValueType = (type: string): FilterValueType | undefined => {
+  if (type === "int" || type === "float") return "number";
+  if (type === "bool") return "bool";
+  if (type === "string") return "string";
+  return undefined;
+};
+
+// Typed comparison of a typed-in value against a facet value
+const sameValue = (item: FacetValue, value: string | undefined, valueType: FilterValueType): boolean => {
+  if (value === undefined || facetValueType(item.type) !== valueType) return false;
+  if (valueType === "number") return value.trim() !== "" && Number(value) === item.value;
+  if (valueType === "bool") return value.trim().toLowerCase() === String(item.value);
+  return value === item.value;
+};
+
+const valuesListId = (field: string): string => `metadata-filter-values-${encodeURIComponent(field)}`;
+
 const needsValue = (operator: FilterOperator): boolean => {
-  return operator === "equals" || operator === "contains";
+  return !["exists", "not_exists", "not_empty"].includes(operator);
 };
 
 export function MetadataFilter({ 
+  collectionName,
   filters, 
   onFiltersChange, 
   onApplyFilters, 
@@ -55,9 +123,77 @@ export function MetadataFilter({
   const [newCondition, setNewCondition] = useState<FilterCondition>({
     field: "",
     operator: "equals",
-    value: ""
+    value: "",
+    value_type: "string"
   });
 
+  const [facets, setFacets] = useState<Record<string, FacetField>>({});
+
+  useEffect(() => {
+    if (!collectionName) return;
+    let cancelled = false;
+    let retry: ReturnType<typeof setTimeout> | undefined;
+    const load = async () => {
+      try {
+        const response = await fetch(`/api/collections/${encodeURIComponent(collectionName)}/facets?top_k=50`);
+        if (!response.ok) return;
+        const data = await response.json();
+        if (cancelled) return;
+        setFacets(Object.fromEntries(data.fields.map((field: FacetField) => [field.key, field])));
+        // The index is built in the background; poll until the first scan is done
+        if (data.status === 'building' || data.stale) {
+          retry = setTimeout(load, 2000);
+        }
+      } catch {
+        // Suggestions are optional
+      }
+    };
+    load();
+    return () => {
+      cancelled = true;
+      if (retry) clearTimeout(retry);
+    };
+  }, [collectionName]);
+
+  // Most common value type of a field according to the facet index, when it is known
+  const inferValueType = (field: string): FilterValueType | undefined => {
+    const facet = facets[field];
+    if (!facet) return undefined;
+    let best: FilterValueType | undefined;
+    let bestCount = 0;
+    for (const [type, count] of Object.entries(facet.types)) {
+      const valueType = facetValueType(type);
+      if (valueType && count > bestCount) {
+        best = valueType;
+        bestCount = count;
+      }
+    }
+    return best;
+  };
+
+  // Picking a suggested value carries its type, so "5" from an int field is sent as a number
+  const suggestedValueType = (field: string, value: string): FilterValueType | undefined => {
+    const item = facets[field]?.top.find((candidate) => String(candidate.value) === value);
+    return item ? facetValueType(item.type) : undefined;
+  };
+
+  // Documents with field = value according to the facet index, when it is known
+  const expectedMatches = (condition: FilterCondition): number | undefined => {
+    const facet = facets[condition.field];
+    if (!facet) return undefined;
+    switch (condition.operator) {
+      case "equals": {
+        const valueType = condition.value_type || "string";
+        const match = facet.top.find((item) => sameValue(item, condition.value, valueType));
+        return match?.count;
+      }
+      case "exists":
+        return facet.count;
+      default:
+        return undefined;
+    }
+  };
+
   const addCondition = () => {
     if (!newCondition.field.trim()) return;
     
@@ -76,13 +212,18 @@ export function MetadataFilter({
       condition.value = newCondition.value.trim();
     }
     
+    if (needsValueType(newCondition.operator)) {
+      condition.value_type = newCondition.value_type || "string";
+    }
+    
     onFiltersChange([...filters, condition]);
     
     // Reset form
     setNewCondition({
       field: "",
       operator: "equals",
-      value: ""
+      value: "",
+      value_type: "string"
     });
   };
 
@@ -99,6 +240,11 @@ export function MetadataFilter({
         if (!needsValue(updated.operator)) {
           delete updated.value;
         }
+        if (needsValueType(updated.operator)) {
+          updated.value_type = updated.value_type || "string";
+        } else {
+          delete updated.value_type;
+        }
         return updated;
       }
       return filter;
@@ -124,9 +270,13 @@ export function MetadataFilter({
                 <div key={index} className="flex items-center gap-2 p-2 bg-muted/50 rounded-md">
                   <Input
                     value={filter.field}
-                    onChange={(e) => updateCondition(index, { field: e.target.value })}
+                    onChange={(e) => updateCondition(index, {
+                      field: e.target.value,
+                      value_type: inferValueType(e.target.value) ?? filter.value_type
+                    })}
                     placeholder="Field name"
                     className="w-32"
+                    list="metadata-filter-fields"
                   />
                   <Select
                     value={filter.operator}
@@ -151,11 +301,35 @@ export function MetadataFilter({
                   {needsValue(filter.operator) && (
                     <Input
                       value={filter.value || ""}
-                      onChange={(e) => updateCondition(index, { value: e.target.value })}
+                      onChange={(e) => updateCondition(index, {
+                        value: e.target.value,
+                        value_type: suggestedValueType(filter.field, e.target.value) ?? filter.value_type
+                      })}
                       placeholder="Value"
                       className="flex-1"
+                      list={facets[filter.field] ? valuesListId(filter.field) : undefined}
                     />
                   )}
+                  {needsValueType(filter.operator) && (
+                    <Select
+                      value={filter.value_type || "string"}
+                      onValueChange={(value: FilterValueType) => updateCondition(index, { value_type: value })}
+                    >
+                      <SelectTrigger className="w-24">
+                        <SelectValue />
+                      </SelectTrigger>
+                      <SelectContent>
+                        {Object.entries(valueTypeLabels).map(([type, label]) => (
+                          <SelectItem key={type} value={type}>{label}</SelectItem>
+                        ))}
+                      </SelectContent>
+                    </Select>
+                  )}
+                  {expectedMatches(filter) !== undefined && (
+                    <Badge variant="secondary" title="Expected matches">
+                      ~{expectedMatches(filter)}
+                    </Badge>
+                  )}
                   {!needsValue(filter.operator) && (
                     <Badge variant="outline" className="flex-1 justify-center">
                       {operatorDescriptions[filter.operator]}
@@ -175,15 +349,38 @@ export function MetadataFilter({
           </div>
         )}
 
+        {/* Suggestions from the facet index */}
+        <datalist id="metadata-filter-fields">
+          {Object.values(facets).map((facet) => (
+            <option key={facet.key} value={facet.key}>
+              {facet.count} documents
+            </option>
+          ))}
+        </datalist>
+        {Object.values(facets).map((facet) => (
+          <datalist key={facet.key} id={valuesListId(facet.key)}>
+            {facet.top.map((item) => (
+              <option key={`${item.type}:${String(item.value)}`} value={String(item.value)}>
+                {item.count} documents ({item.type})
+              </option>
+            ))}
+          </datalist>
+        ))}
+
         {/* Add New Condition */}
         <div className="space-y-2">
           <Label className="text-sm font-medium">Add New Filter Condition:</Label>
           <div className="flex items-center gap-2">
             <Input
               value={newCondition.field}
-              onChange={(e) => setNewCondition({ ...newCondition, field: e.target.value })}
+              onChange={(e) => setNewCondition({
+                ...newCondition,
+                field: e.target.value,
+                value_type: inferValueType(e.target.value) ?? newCondition.value_type
+              })}
               placeholder="Field name"
               className="w-32"
+              list="metadata-filter-fields"
               onKeyDown={(e) => {
                 if (e.key === 'Enter') {
                   addCondition();
@@ -215,9 +412,14 @@ export function MetadataFilter({
             {needsValue(newCondition.operator) && (
               <Input
                 value={newCondition.value || ""}
-                onChange={(e) => setNewCondition({ ...newCondition, value: e.target.value })}
+                onChange={(e) => setNewCondition({
+                  ...newCondition,
+                  value: e.target.value,
+                  value_type: suggestedValueType(newCondition.field, e.target.value) ?? newCondition.value_type
+                })}
                 placeholder="Value"
                 className="flex-1"
+                list={facets[newCondition.field] ? valuesListId(newCondition.field) : undefined}
                 onKeyDown={(e) => {
                   if (e.key === 'Enter') {
                     addCondition();
@@ -225,6 +427,21 @@ export function MetadataFilter({
                 }}
               />
             )}
+            {needsValueType(newCondition.operator) && (
+              <Select
+                value={newCondition.value_type || "string"}
+                onValueChange={(value: FilterValueType) => setNewCondition({ ...newCondition, value_type: value })}
+              >
+                <SelectTrigger className="w-24">
+                  <SelectValue />
+                </SelectTrigger>
+                <SelectContent>
+                  {Object.entries(valueTypeLabels).map(([type, label]) => (
+                    <SelectItem key={type} value={type}>{label}</SelectItem>
+                  ))}
+                </SelectContent>
+              </Select>
+            )}
             {!needsValue(newCondition.operator) && (
               <Badge variant="outline" className="flex-1 justify-center">
                 {operatorDescriptions[newCondition.operator]}
@@ -26,6 +26,8 @@ interface Document {
   id: string
   document: string
   metadata?: Record<string, any>
+  // Set when the listing returned a preview of a longer document
+  truncated?: boolean
 }
 
 interface CollectionDataTableProps {
@@ -54,9 +56,30 @@ export function CollectionDataTable({
     setDeleteDialogOpen(true)
   }
 
-  const handleViewDetail = (document: Document) => {
+  const handleViewDetail = async (document: Document) => {
     setSelectedDocument(document)
     setDetailDialogOpen(true)
+    if (!document.truncated) return
+
+    // Listings only carry a preview; load the full text for the detail view
+    try {
+      const response = await fetch(`/api/collections/${encodeURIComponent(collectionName)}/get`, {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ ids: [document.id], include: ["documents"] }),
+      })
+      if (!response.ok) throw new Error(`HTTP ${response.status}`)
+      const result = await response.json()
+      const full = result.data[0]
+      if (full) {
+        setSelectedDocument((current) =>
+          current?.id === document.id ? { ...current, document: full.document, truncated: false } : current
+        )
+      }
+    } catch (error) {
+      toast.error("Failed to load the full document")
+      console.error("Load document error:", error)
+    }
   }
 
   const copyToClipboard = async (text: string, label: string) => {
@@ -0,0 +1,161 @@
+"use client"
+
+import { useEffect, useState } from "react"
+import { Button } from "@/components/ui/button"
+import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card"
+import { BarChart3, RefreshCw } from "lucide-react"
+
+interface HistogramBucket {
+  min: number
+  max: number | null
+  count: number
+}
+
+interface CollectionStatsData {
+  status: "scanning" | "ready" | "failed"
+  stale: boolean
+  documents: number
+  scanned_at: number | null
+  text: { documents: number; bytes: number; mean_length: number | null; length_histogram: HistogramBucket[] }
+  metadata: { documents: number; keys: Record<string, number>; coverage: Record<string, number>; keys_exact: boolean }
+  embeddings: {
+    count: number
+    dimensions: Record<string, number>
+    mean_norm: number | null
+    std_norm: number | null
+    norm_histogram: HistogramBucket[]
+  }
+  message: string | null
+}
+
+interface CollectionStatsProps {
+  collectionName: string
+}
+
+function formatBytes(bytes: number) {
+  const units = ["B", "KB", "MB", "GB", "TB"]
+  let value = bytes
+  let unit = 0
+  while (value >= 1024 && unit < units.length - 1) {
+    value /= 1024
+    unit++
+  }
+  return `${value.toFixed(unit ? 1 : 0)} ${units[unit]}`
+}
+
+function Histogram({ buckets, label }: { buckets: HistogramBucket[]; label: (bucket: HistogramBucket) => string }) {
+  const peak = Math.max(1, ...buckets.map((bucket) => bucket.count))
+  return (
+    <div className="space-y-1">
+      {buckets.filter((bucket) => bucket.count > 0).map((bucket) => (
+        <div key={bucket.min} className="flex items-center gap-2 text-xs">
+          <span className="w-24 shrink-0 text-muted-foreground">{label(bucket)}</span>
+          <div className="h-2 rounded bg-blue-500" style={{ width: `${(bucket.count / peak) * 100}%`, minWidth: 2 }} />
+          <span className="text-muted-foreground">{bucket.count.toLocaleString()}</span>
+        </div>
+      ))}
+    </div>
+  )
+}
+
+export function CollectionStats({ collectionName }: CollectionStatsProps) {
+  const [stats, setStats] = useState<CollectionStatsData | null>(null)
+  const [refreshing, setRefreshing] = useState(false)
+
+  const loadStats = async (refresh = false) => {
+    try {
+      const response = await fetch(
+        `/api/collections/${encodeURIComponent(collectionName)}/stats${refresh ? "?refresh=true" : ""}`
+      )
+      if (response.ok) {
+        setStats(await response.json())
+      }
+    } catch (error) {
+      console.error("Failed to load collection stats:", error)
+    }
+  }
+
+  useEffect(() => {
+    loadStats()
+  }, [collectionName])
+
+  // Poll while a scan is running so the numbers fill in
+  useEffect(() => {
+    if (!stats || (stats.status !== "scanning" && !stats.stale)) return
+    const timer = setTimeout(() => loadStats(), 2000)
+    return () => clearTimeout(timer)
+  }, [stats])
+
+  const handleRefresh = async () => {
+    setRefreshing(true)
+    await loadStats(true)
+    setRefreshing(false)
+  }
+
+  if (!stats) return null
+
+  const keys = Object.entries(stats.metadata.keys)
+  const dimensions = Object.keys(stats.embeddings.dimensions)
+
+  return (
+    <Card className="w-full">
+      <CardHeader className="pb-4">
+        <CardTitle className="flex items-center justify-between text-lg">
+          <span className="flex items-center gap-2">
+            <BarChart3 className="h-5 w-5" />
+            Collection Stats
+            {(stats.status === "scanning" || stats.stale) && (
+              <span className="text-sm font-normal text-muted-foreground">(scanning...)</span>
+            )}
+          </span>
+          <Button variant="ghost" size="sm" onClick={handleRefresh} disabled={refreshing || stats.status === "scanning"}>
+            <RefreshCw className={`h-4 w-4 ${refreshing ? "animate-spin" : ""}`} />
+          </Button>
+        </CardTitle>
+      </CardHeader>
+      <CardContent className="grid gap-6 md:grid-cols-3 text-sm">
+        <div className="space-y-2">
+          <div className="font-medium">Documents</div>
+          <div>{stats.documents.toLocaleString()} documents, {formatBytes(stats.text.bytes)} of text</div>
+          {stats.text.mean_length !== null && (
+            <div className="text-muted-foreground">Mean length {stats.text.mean_length.toLocaleString()} characters</div>
+          )}
+          <Histogram
+            buckets={stats.text.length_histogram}
+            label={(bucket) => (bucket.max === null ? `${bucket.min}+` : `${bucket.min}-${bucket.max - 1}`)}
+          />
+        </div>
+        <div className="space-y-2">
+          <div className="font-medium">Metadata keys</div>
+          {keys.length === 0 && <div className="text-muted-foreground">No metadata</div>}
+          {keys.slice(0, 10).map(([key, count]) => (
+            <div key={key} className="flex justify-between gap-2">
+              <span className="font-mono truncate">{key}</span>
+              <span className="text-muted-foreground">
+                {count.toLocaleString()} ({((stats.metadata.coverage[key] ?? 0) * 100).toFixed(1)}%)
+              </span>
+            </div>
+          ))}
+          {keys.length > 10 && <div className="text-muted-foreground">+{keys.length - 10} more keys</div>}
+        </div>
+        <div className="space-y-2">
+          <div className="font-medium">Embeddings</div>
+          <div>
+            {stats.embeddings.count.toLocaleString()} vectors
+            {dimensions.length > 0 && `, ${dimensions.join(" / ")} dimensions`}
+          </div>
+          {stats.embeddings.mean_norm !== null && (
+            <div className="text-muted-foreground">
+              Norm {stats.embeddings.mean_norm.toFixed(3)} ± {stats.embeddings.std_norm?.toFixed(3)}
+            </div>
+          )}
+          <Histogram
+            buckets={stats.embeddings.norm_histogram}
+            label={(bucket) => (bucket.max === null ? `${bucket.min}+` : `${bucket.min}-${bucket.max}`)}
+          />
+        </div>
+        {stats.message && <div className="md:col-span-3 text-red-600">{stats.message}</div>}
+      </CardContent>
+    </Card>
+  )
+}
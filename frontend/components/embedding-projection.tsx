@@ -0,0 +1,163 @@
+"use client"
+
+import { useEffect, useRef, useState } from "react"
+import { Button } from "@/components/ui/button"
+import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card"
+import { ScatterChart } from "lucide-react"
+import { toast } from "sonner"
+
+interface ProjectionHeader {
+  count: number
+  method: "pca" | "random"
+  matching: number
+  explained_variance: number[] | null
+  ids: string[]
+}
+
+interface Projection {
+  header: ProjectionHeader
+  coords: Float32Array
+}
+
+interface EmbeddingProjectionProps {
+  collectionName: string
+}
+
+const WIDTH = 640
+const HEIGHT = 400
+const PADDING = 12
+
+// Binary layout: uint32 header length, JSON header, then count x 2 float32 (x, y)
+function parseProjection(buffer: ArrayBuffer): Projection {
+  const headerLength = new DataView(buffer).getUint32(0, true)
+  const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 4, headerLength)))
+  const coords = new Float32Array(buffer, 4 + headerLength, header.count * 2)
+  return { header, coords }
+}
+
+export function EmbeddingProjection({ collectionName }: EmbeddingProjectionProps) {
+  const canvasRef = useRef<HTMLCanvasElement>(null)
+  const [method, setMethod] = useState<"pca" | "random">("pca")
+  const [projection, setProjection] = useState<Projection | null>(null)
+  const [isLoading, setIsLoading] = useState(false)
+  const [selectedId, setSelectedId] = useState<string | null>(null)
+
+  const loadProjection = async () => {
+    setIsLoading(true)
+    setSelectedId(null)
+    try {
+      const response = await fetch(`/api/collections/${encodeURIComponent(collectionName)}/projection`, {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ method }),
+      })
+      if (!response.ok) {
+        const error = await response.json().catch(() => ({}))
+        throw new Error(error.detail || `HTTP ${response.status}`)
+      }
+      setProjection(parseProjection(await response.arrayBuffer()))
+    } catch (error) {
+      toast.error(`Failed to load embedding projection: ${error instanceof Error ? error.message : error}`)
+    } finally {
+      setIsLoading(false)
+    }
+  }
+
+  // Scale from projected coordinates to canvas pixels
+  const bounds = () => {
+    const coords = projection!.coords
+    let minX = Infinity, maxX = -Infinity, minY = Infinity, maxY = -Infinity
+    for (let i = 0; i < coords.length; i += 2) {
+      minX = Math.min(minX, coords[i]); maxX = Math.max(maxX, coords[i])
+      minY = Math.min(minY, coords[i + 1]); maxY = Math.max(maxY, coords[i + 1])
+    }
+    const scaleX = (WIDTH - 2 * PADDING) / (maxX - minX || 1)
+    const scaleY = (HEIGHT - 2 * PADDING) / (maxY - minY || 1)
+    return {
+      x: (value: number) => PADDING + (value - minX) * scaleX,
+      y: (value: number) => HEIGHT - PADDING - (value - minY) * scaleY,
+    }
+  }
+
+  useEffect(() => {
+    const canvas = canvasRef.current
+    if (!canvas || !projection) return
+    const context = canvas.getContext("2d")
+    if (!context) return
+    context.clearRect(0, 0, WIDTH, HEIGHT)
+    const { x, y } = bounds()
+    const coords = projection.coords
+    context.fillStyle = "rgba(37, 99, 235, 0.5)"
+    for (let i = 0; i < coords.length; i += 2) {
+      context.fillRect(x(coords[i]) - 1, y(coords[i + 1]) - 1, 2, 2)
+    }
+  }, [projection])
+
+  const handleClick = (event: React.MouseEvent<HTMLCanvasElement>) => {
+    if (!projection || projection.header.count === 0) return
+    const rect = event.currentTarget.getBoundingClientRect()
+    const px = ((event.clientX - rect.left) * WIDTH) / rect.width
+    const py = ((event.clientY - rect.top) * HEIGHT) / rect.height
+    const { x, y } = bounds()
+    const coords = projection.coords
+    let nearest = 0
+    let best = Infinity
+    for (let i = 0; i < coords.length; i += 2) {
+      const distance = (x(coords[i]) - px) ** 2 + (y(coords[i + 1]) - py) ** 2
+      if (distance < best) {
+        best = distance
+        nearest = i / 2
+      }
+    }
+    setSelectedId(projection.header.ids[nearest])
+  }
+
+  const explained = projection?.header.explained_variance
+
+  return (
+    <Card className="w-full">
+      <CardHeader className="pb-4">
+        <CardTitle className="flex items-center gap-2 text-lg">
+          <ScatterChart className="h-5 w-5" />
+          Embedding Map
+        </CardTitle>
+      </CardHeader>
+      <CardContent className="space-y-3">
+        <div className="flex items-center gap-2">
+          <select
+            value={method}
+            onChange={(e) => setMethod(e.target.value as "pca" | "random")}
+            className="px-3 py-2 text-sm border border-input rounded-md bg-background"
+            disabled={isLoading}
+          >
+            <option value="pca">PCA</option>
+            <option value="random">Random projection</option>
+          </select>
+          <Button onClick={loadProjection} disabled={isLoading} size="sm">
+            {isLoading ? "Projecting..." : projection ? "Reload" : "Load"}
+          </Button>
+          {projection && (
+            <span className="text-sm text-muted-foreground">
+              {projection.header.count.toLocaleString()} of {projection.header.matching.toLocaleString()} documents
+              {explained && ` · explained variance ${explained.map((v) => `${(v * 100).toFixed(1)}%`).join(" / ")}`}
+            </span>
+          )}
+        </div>
+        {projection && (
+          <canvas
+            ref={canvasRef}
+            width={WIDTH}
+            height={HEIGHT}
+            onClick={handleClick}
+            className="w-full max-w-[640px] border rounded-md cursor-crosshair bg-background"
+          />
+        )}
+        {selectedId && (
+          <div className="text-sm">
+            Nearest document: <span className="font-mono">{selectedId}</span>
+          </div>
+        )}
+      </CardContent>
+    </Card>
+  )
+}